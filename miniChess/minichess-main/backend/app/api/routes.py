@@ -1,38 +1,163 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from ..services.game_service import GameService
+from ..services.game_service import GameService, FULL_FORMAT, COMPACT_FORMAT
+from ..services.analysis_service import AnalysisService
+from ..services.search_pool import SearchPool
+from ..services.search_executor import SearchExecutor, SearchQueueFull
+from ..services.event_broker import LAGGED
+from ..services.session_manager import DEFAULT_TT_MB, SessionManager, SessionNotFound
+from ..services.game_store import open_store
+from ..services.metrics import metrics
+from ..models.opening_book import DEFAULT_BOOK
+from ..models.tablebase import DEFAULT_TABLEBASES
 from ..schemas.game import GameStateSchema, MoveSchema
+from ..schemas.analysis import BatchAnalysisRequest
 
 router = APIRouter()
-game_service = GameService()
+tablebase_path = os.getenv("MINICHESS_TABLEBASES", DEFAULT_TABLEBASES)
+session_manager = SessionManager(max_sessions=int(os.getenv("MINICHESS_MAX_SESSIONS", "5000")),
+                                 idle_timeout=float(os.getenv("MINICHESS_IDLE_TIMEOUT", "1800")),
+                                 max_memory_mb=float(os.getenv("MINICHESS_MAX_MEMORY_MB", "1024")),
+                                 tt_size_mb=float(os.getenv("MINICHESS_TT_MB", str(DEFAULT_TT_MB))),
+                                 shared_tt_mb=float(os.getenv("MINICHESS_SHARED_TT_MB", "0")),
+                                 parallel=os.getenv("MINICHESS_PARALLEL") == "1",
+                                 workers=int(os.getenv("MINICHESS_WORKERS", "0")) or None,
+                                 book_path=os.getenv("MINICHESS_BOOK", DEFAULT_BOOK),
+                                 tablebase_path=tablebase_path,
+                                 store=open_store(os.getenv("MINICHESS_STORE")),
+                                 shared_cache_path=os.getenv("MINICHESS_SEARCH_CACHE"),
+                                 shared_cache_mb=int(os.getenv("MINICHESS_SEARCH_CACHE_MB", "64")),
+                                 shared_cache_warm=os.getenv("MINICHESS_SEARCH_CACHE_WARM"))
+search_executor = SearchExecutor(max_workers=int(os.getenv("MINICHESS_SEARCH_THREADS", "4")),
+                                 max_pending=int(os.getenv("MINICHESS_SEARCH_QUEUE", "16")))
+# Batch analysis shares the root-split workers when they exist.
+analysis_pool = session_manager.search_pool or SearchPool(int(os.getenv("MINICHESS_ANALYSIS_WORKERS", "0")) or None)
+analysis_service = AnalysisService(analysis_pool, tablebase_path=tablebase_path,
+                                   eval_mode=os.getenv("MINICHESS_ANALYSIS_EVAL", "incremental"))
+MAX_BATCH_POSITIONS = int(os.getenv("MINICHESS_BATCH_MAX", "100000"))
+COMPACT_MEDIA_TYPE = "application/vnd.minichess.compact+json"
 
 class GameInitRequest(BaseModel):
     mode: str = "ai"
     ai_depth_white: int = 2
     ai_depth_black: int = 2
+    time_ms: int = 5000
+
+async def get_session(game_id: Optional[str]) -> GameService:
+    if not game_id:
+        raise HTTPException(status_code=400, detail="game_id is required")
+    try:
+        return await session_manager.get_async(game_id)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Unknown or expired game_id")
+
+def response_format(http_request: Request, fmt: Optional[str]) -> str:
+    if fmt is not None:
+        if fmt not in (FULL_FORMAT, COMPACT_FORMAT):
+            raise HTTPException(status_code=400, detail="format must be 'full' or 'compact'")
+        return fmt
+    return COMPACT_FORMAT if COMPACT_MEDIA_TYPE in http_request.headers.get("accept", "") else FULL_FORMAT
+
+def state_response(body: bytes, fmt: str) -> Response:
+    return Response(body, media_type=COMPACT_MEDIA_TYPE if fmt == COMPACT_FORMAT else "application/json")
 
 @router.post("/game/init", response_model=GameStateSchema)
-async def init_game(request: GameInitRequest):
-    print(f"Initializing game with mode: {request.mode}, AI depth white: {request.ai_depth_white}, AI depth black: {request.ai_depth_black}")
+async def init_game(request: GameInitRequest, http_request: Request, game_id: Optional[str] = None,
+                    fmt: Optional[str] = Query(None, alias="format")):
+    print(f"Initializing game with mode: {request.mode}, AI depth white: {request.ai_depth_white}, AI depth black: {request.ai_depth_black}, time: {request.time_ms} ms")
     if request.mode not in ["ai", "human", "ai_vs_ai"]:
         raise HTTPException(status_code=400, detail="Mode must be 'ai', 'human', or 'ai_vs_ai'")
-    return game_service.init_game(request.mode, request.ai_depth_white, request.ai_depth_black)
+    if request.time_ms <= 0:
+        raise HTTPException(status_code=400, detail="time_ms must be positive")
+    fmt = response_format(http_request, fmt)
+    game_service = session_manager.create(game_id)
+    response = game_service.init_game(request.mode, request.ai_depth_white, request.ai_depth_black, request.time_ms, fmt)
+    session_manager.enforce_limits()
+    return state_response(response, fmt)
 
 @router.post("/game/select", response_model=GameStateSchema)
-async def select_piece(position: dict):
+async def select_piece(position: dict, http_request: Request, game_id: Optional[str] = None,
+                       fmt: Optional[str] = Query(None, alias="format")):
     row, col = position.get("row"), position.get("col")
     if not (isinstance(row, int) and isinstance(col, int) and 0 <= row < 6 and 0 <= col < 5):
         raise HTTPException(status_code=400, detail="Invalid position")
-    return game_service.select_piece(row, col)
+    fmt = response_format(http_request, fmt)
+    game_service = await get_session(game_id)
+    return state_response(game_service.select_piece(row, col, fmt), fmt)
 
 @router.post("/game/move", response_model=GameStateSchema)
-async def make_move(move: MoveSchema):
-    return game_service.make_move(move.start_row, move.start_col, move.end_row, move.end_col)
+async def make_move(move: MoveSchema, http_request: Request, game_id: Optional[str] = None,
+                    fmt: Optional[str] = Query(None, alias="format")):
+    fmt = response_format(http_request, fmt)
+    game_service = await get_session(game_id)
+    return state_response(game_service.make_move(move.start_row, move.start_col, move.end_row, move.end_col, fmt), fmt)
 
 @router.post("/game/ai_move", response_model=GameStateSchema)
-async def make_ai_move():
-    return game_service.make_ai_move()
+async def make_ai_move(request: Request, game_id: Optional[str] = None,
+                       fmt: Optional[str] = Query(None, alias="format")):
+    fmt = response_format(request, fmt)
+    game_service = await get_session(game_id)
+    try:
+        response = await search_executor.run(request, game_service.make_ai_move, fmt,
+                                             on_disconnect=game_service.cancel_ai_move)
+    except SearchQueueFull:
+        raise HTTPException(status_code=429, detail="Too many AI moves in progress, retry later")
+    return state_response(response if response is not None else game_service.get_game_state(fmt), fmt)
 
 @router.get("/game/state", response_model=GameStateSchema)
-async def get_game_state():
-    return game_service.get_game_state()
\ No newline at end of file
+async def get_game_state(request: Request, game_id: Optional[str] = None,
+                         fmt: Optional[str] = Query(None, alias="format")):
+    fmt = response_format(request, fmt)
+    game_service = await get_session(game_id)
+    return state_response(game_service.get_game_state(fmt), fmt)
+
+async def forward_events(websocket: WebSocket, queue: asyncio.Queue):
+    while True:
+        event = await queue.get()
+        if event is LAGGED:
+            await websocket.close(code=1013, reason="Client fell behind, reconnect for a fresh state")
+            return
+        await websocket.send_text(event)
+
+@router.websocket("/game/ws/{game_id}")
+async def game_events(websocket: WebSocket, game_id: str):
+    # Pushes a compact snapshot, then "diff" events for every state change,
+    # "info" events for each completed search iteration and a "move" event
+    # when the AI plays, so clients need not poll /game/state.
+    try:
+        game_service = await session_manager.get_async(game_id)
+    except SessionNotFound:
+        await websocket.close(code=4404, reason="Unknown or expired game_id")
+        return
+    await websocket.accept()
+    queue, snapshot = game_service.subscribe()
+    await websocket.send_text(snapshot)
+    sender = asyncio.create_task(forward_events(websocket, queue))
+    try:
+        # Nothing is expected from the client; reading only notices it leaving.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        game_service.unsubscribe(queue)
+
+@router.post("/analysis/batch")
+async def analyse_batch(request: BatchAnalysisRequest):
+    if not request.positions:
+        raise HTTPException(status_code=400, detail="positions must not be empty")
+    if len(request.positions) > MAX_BATCH_POSITIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_POSITIONS} positions per batch")
+    if request.depth < 0 or request.time_ms <= 0:
+        raise HTTPException(status_code=400, detail="depth must not be negative and time_ms must be positive")
+    return StreamingResponse(analysis_service.stream(request.positions, request.depth, request.time_ms),
+                             media_type="application/x-ndjson")
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,186 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from .models.chess_ai import ChessAI
+from .models.game_state import GameState
+from .models.batch_evaluation import evaluate_batch
+
+# FEN and known perft node counts for depths 1, 2, 3, ...
+POSITIONS = {
+    'initial': ('rnkbr/ppppp/5/5/PPPPP/RNKBR w', (12, 135, 1667, 18991)),
+    'pawn-chains': ('rnkbr/p1p1p/1p1p1/1P1P1/P1P1P/RNKBR w', (11, 110, 1125, 11360)),
+    'midgame': ('r1kbr/1p2P/nP1p1/R1p2/4P/1NKBR w', (14, 160, 2456, 29375)),
+    'promotion-race': ('2k2/P4/5/5/4p/2K2 w', (5, 22, 173, 1203)),
+    'mate-in-one': ('k4/5/1QK2/5/5/5 w', (19, 11, 185, 392)),
+}
+
+# Metrics where a larger value is better; everything else except perft counts
+# is a duration where smaller is better.
+HIGHER_IS_BETTER = ('nps',)
+# Durations shorter than this are dominated by timer noise and never compared.
+MIN_COMPARED_SECONDS = 0.05
+
+
+def perft(game_state, depth):
+    if depth == 0:
+        return 1
+    moves = game_state.get_all_possible_moves(game_state.turn)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for start, end in moves:
+        game_state.make_move(start[0], start[1], end[0], end[1])
+        nodes += perft(game_state, depth - 1)
+        game_state.unmake_move()
+    return nodes
+
+
+def _generate_moves(game_state):
+    # Drop the cached position info so every call measures real generation.
+    game_state.position = None
+    return game_state.get_all_possible_moves(game_state.turn)
+
+
+def _rate(fn, min_time):
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def bench_position(name, perft_depth, search_depth, min_time):
+    fen, expected = POSITIONS[name]
+    game_state = GameState.from_fen(fen)
+    result = {'perft': {}, 'perft_seconds': {}, 'perft_errors': []}
+    for depth in range(1, perft_depth + 1):
+        start = time.perf_counter()
+        nodes = perft(game_state, depth)
+        result['perft_seconds'][str(depth)] = time.perf_counter() - start
+        result['perft'][str(depth)] = nodes
+        if depth <= len(expected) and nodes != expected[depth - 1]:
+            result['perft_errors'].append(f"perft({depth}) = {nodes}, expected {expected[depth - 1]}")
+
+    chess_ai = ChessAI(depth=search_depth)
+    full_ai = ChessAI(depth=search_depth, eval_mode='full')
+    result['movegen_nps'] = _rate(lambda: _generate_moves(game_state), min_time)
+    result['evaluate_incremental_nps'] = _rate(lambda: chess_ai.evaluate_incremental(game_state), min_time)
+    result['evaluate_full_nps'] = _rate(lambda: full_ai.evaluate_board(game_state), min_time)
+    children = []
+    for start, end in game_state.get_all_possible_moves(game_state.turn):
+        child = game_state.copy()
+        child.make_move(start[0], start[1], end[0], end[1])
+        children.append(child)
+    if children:
+        # Positions per second when every child of the position is scored as one batch.
+        result['evaluate_batch_nps'] = _rate(lambda: evaluate_batch(children), min_time) * len(children)
+
+    if game_state.game_over:
+        return result
+
+    # Each depth gets a fresh engine so earlier iterations cannot warm its
+    # transposition table; the time limit is effectively disabled.
+    result['time_to_depth'] = {}
+    result['search_nodes'] = {}
+    result['search_nps'] = {}
+    tracemalloc.start()
+    for depth in range(1, search_depth + 1):
+        chess_ai = ChessAI(depth=depth, time_ms=3600 * 1000)
+        start = time.perf_counter()
+        chess_ai.search(game_state, game_state.turn)
+        elapsed = time.perf_counter() - start
+        result['time_to_depth'][str(depth)] = elapsed
+        result['search_nodes'][str(depth)] = chess_ai.nodes
+        result['search_nps'][str(depth)] = chess_ai.nodes / elapsed if elapsed > 0 else 0
+    result['search_peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+def run(perft_depth=3, search_depth=3, min_time=0.5, positions=None):
+    names = positions or list(POSITIONS)
+    return {
+        'python': sys.version.split()[0],
+        'perft_depth': perft_depth,
+        'search_depth': search_depth,
+        'positions': {name: bench_position(name, perft_depth, search_depth, min_time) for name in names},
+    }
+
+
+def compare(current, baseline, tolerance):
+    failures = []
+    for name, metrics in current['positions'].items():
+        base = baseline.get('positions', {}).get(name)
+        if not base:
+            continue
+        for depth, count in metrics['perft'].items():
+            expected = base.get('perft', {}).get(depth)
+            if expected is not None and expected != count:
+                failures.append(f"{name}: perft({depth}) = {count}, baseline {expected}")
+        baseline_metrics = _flatten(base)
+        for key, value in _flatten(metrics).items():
+            if key.startswith(('perft.', 'perft_errors', 'search_nodes.')):
+                continue
+            expected = baseline_metrics.get(key)
+            if not expected:
+                continue
+            if key.split('.')[0].endswith(HIGHER_IS_BETTER):
+                regressed = value < expected * (1 - tolerance)
+            elif 'seconds' in key or key.startswith('time_to_depth'):
+                regressed = max(value, expected) >= MIN_COMPARED_SECONDS and value > expected * (1 + tolerance)
+            else:
+                regressed = value > expected * (1 + tolerance)
+            if regressed:
+                failures.append(f"{name}: {key} = {value:.4g}, baseline {expected:.4g}")
+    return failures
+
+
+def _flatten(metrics, prefix=''):
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.bench', description="MiniChess engine benchmarks")
+    parser.add_argument('--perft-depth', type=int, default=3)
+    parser.add_argument('--search-depth', type=int, default=3)
+    parser.add_argument('--min-time', type=float, default=0.5, help="seconds spent on each throughput metric")
+    parser.add_argument('--position', action='append', choices=sorted(POSITIONS), help="limit to these positions")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against a JSON file written by --output")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args.perft_depth, args.search_depth, args.min_time, args.position)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    status = 0
+    for name, metrics in results['positions'].items():
+        for error in metrics['perft_errors']:
+            print(f"PERFT MISMATCH {name}: {error}", file=sys.stderr)
+            status = 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
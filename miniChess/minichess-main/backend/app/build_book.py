@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+from .models.chess_ai import ChessAI, EVAL_MODES
+from .models.game_state import GameState
+from .models.opening_book import DEFAULT_BOOK, write_book
+
+
+def build(depth=5, full_plies=2, line_plies=6, time_ms=60000, eval_mode='incremental', log=None):
+    # Every position within full_plies of the start is searched, then each one
+    # is extended by a self-play line of line_plies engine moves, so the book
+    # covers all early replies and the main lines that follow from them.
+    chess_ai = ChessAI(depth=depth, time_ms=time_ms, eval_mode=eval_mode)
+    entries = {}
+    started = time.monotonic()
+
+    def analyse(game_state):
+        key = game_state.hash
+        if key not in entries:
+            move = chess_ai.search(game_state, game_state.turn)
+            if move is None:
+                return None
+            entries[key] = (move, chess_ai.score, chess_ai.stats.depth)
+            if log:
+                log(f"{len(entries):5d} positions, {time.monotonic() - started:7.1f}s  "
+                    f"{game_state.to_fen()} -> {move}")
+        return entries[key][0]
+
+    def walk(game_state, plies):
+        if game_state.game_over:
+            return
+        if plies > 0:
+            analyse(game_state)
+            for start, end in game_state.get_all_possible_moves(game_state.turn):
+                game_state.make_move(start[0], start[1], end[0], end[1])
+                walk(game_state, plies - 1)
+                game_state.unmake_move()
+            return
+        played = 0
+        while played < line_plies and not game_state.game_over:
+            move = analyse(game_state)
+            if move is None:
+                break
+            game_state.make_move(move[0][0], move[0][1], move[1][0], move[1][1])
+            played += 1
+        for _ in range(played):
+            game_state.unmake_move()
+
+    walk(GameState(), full_plies)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.build_book', description="Build the MiniChess opening book")
+    parser.add_argument('--output', default=DEFAULT_BOOK)
+    parser.add_argument('--depth', type=int, default=5, help="search depth for every book position")
+    parser.add_argument('--full-plies', type=int, default=2, help="plies from the start where every move is covered")
+    parser.add_argument('--line-plies', type=int, default=6, help="self-play plies added after the full plies")
+    parser.add_argument('--time-ms', type=int, default=60000, help="time limit per position")
+    parser.add_argument('--eval-mode', choices=EVAL_MODES, default='incremental')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr))
+    entries = build(args.depth, args.full_plies, args.line_plies, args.time_ms, args.eval_mode, log)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_book(args.output, entries)
+    print(f"Wrote {len(entries)} positions to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
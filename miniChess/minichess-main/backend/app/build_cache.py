@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+from .models.chess_ai import ChessAI, EVAL_MODES
+from .models.game_state import GameState
+from .models.shared_cache import SharedCache
+
+
+def build(path, size_mb=16, depth=6, plies=2, time_ms=60000, eval_mode='incremental', log=None):
+    # Searches every position within plies of the start, so the early game
+    # that every new game passes through is answered from the cache.
+    cache = SharedCache(path, size_mb)
+    chess_ai = ChessAI(depth=depth, time_ms=time_ms, eval_mode=eval_mode, shared_cache=cache)
+    seen = set()
+    started = time.monotonic()
+
+    def walk(game_state, remaining):
+        if game_state.game_over or game_state.hash in seen:
+            return
+        seen.add(game_state.hash)
+        chess_ai.search(game_state, game_state.turn)
+        if log:
+            log(f"{len(seen):5d} positions, {cache.stores:8d} entries stored, "
+                f"{time.monotonic() - started:7.1f}s  {game_state.to_fen()}")
+        if remaining == 0:
+            return
+        for start, end in game_state.get_all_possible_moves(game_state.turn):
+            game_state.make_move(start[0], start[1], end[0], end[1])
+            walk(game_state, remaining - 1)
+            game_state.unmake_move()
+
+    try:
+        walk(GameState(), plies)
+        return len(seen), cache.stores
+    finally:
+        cache.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.build_cache',
+                                     description="Prebuild a shared search cache to warm servers from")
+    parser.add_argument('output')
+    parser.add_argument('--size-mb', type=int, default=16, help="size of a new cache file")
+    parser.add_argument('--depth', type=int, default=6, help="search depth for every position")
+    parser.add_argument('--plies', type=int, default=2, help="plies from the start that are searched")
+    parser.add_argument('--time-ms', type=int, default=60000, help="time limit per position")
+    parser.add_argument('--eval-mode', choices=EVAL_MODES, default='incremental')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    positions, stores = build(args.output, args.size_mb, args.depth, args.plies, args.time_ms, args.eval_mode, log)
+    print(f"Searched {positions} positions, {stores} entries stored in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
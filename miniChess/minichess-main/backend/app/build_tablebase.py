@@ -0,0 +1,177 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from .models.bitboard import (WHITE, BLACK, PAWN, QUEEN, KING, PIECE_TYPES, SQUARES, SQUARE_COORDS, PROMOTION_ROW,
+                              Bitboards, iter_bits)
+from .models.tablebase import (DEFAULT_TABLEBASES, DRAW, WIN, LOSS, INVALID, DTM_LIMIT, LETTERS, canonical,
+                               parse_signature, position_index, signature, table_size, write_table)
+from .constants import ROWS
+
+# Every king plus one other piece, for either side.
+DEFAULT_SIGNATURES = [f"K{letter}vK" for letter in 'QRBNP'] + [f"KvK{letter}" for letter in 'QRBNP']
+
+
+def dependencies(layout):
+    # Captures remove a piece and promotions turn a pawn into a queen, both of
+    # which land in another table that has to be solved first.
+    result = set()
+    for i, (team, kind) in enumerate(layout):
+        if kind == KING:
+            continue
+        rest = layout[:i] + layout[i + 1:]
+        result.add(signature([(t, k, 0) for t, k in rest]))
+        if kind == PAWN:
+            result.add(signature([(t, k, 0) for t, k in rest + [(team, QUEEN)]]))
+    return result
+
+
+def _placements(layout):
+    for squares in itertools.product(range(SQUARES), repeat=len(layout)):
+        if len(set(squares)) < len(squares):
+            continue
+        # Pawns never stand on either back rank: they start one rank in and
+        # promote on arrival at the far one.
+        if any(kind == PAWN and SQUARE_COORDS[sq][0] in (0, ROWS - 1) for (_, kind), sq in zip(layout, squares)):
+            continue
+        yield [(team, kind, sq) for (team, kind), sq in zip(layout, squares)]
+
+
+def _children(bitboards, pieces, turn):
+    occupant = {sq: i for i, (_, _, sq) in enumerate(pieces)}
+    for kind in range(len(PIECE_TYPES)):
+        for from_sq in iter_bits(bitboards.pieces[turn][kind]):
+            for to_sq in bitboards.legal_targets(turn, kind, from_sq):
+                child = [piece for piece in pieces if piece[2] != to_sq]
+                moved = occupant[from_sq]
+                if to_sq in occupant:
+                    moved -= occupant[to_sq] < moved
+                new_kind = kind
+                if kind == PAWN and SQUARE_COORDS[to_sq][0] == PROMOTION_ROW[turn]:
+                    new_kind = QUEEN
+                child[moved] = (turn, new_kind, to_sq)
+                yield canonical(child)
+
+
+def solve(text, solved, log=None):
+    layout = parse_signature(text)
+    name = signature([(team, kind, 0) for team, kind in layout])
+    size = table_size(len(layout))
+    started = time.monotonic()
+
+    result = bytearray([INVALID]) * size
+    dtm = [0] * size
+    resolved = bytearray(size)
+    remaining = [0] * size
+    slowest = [-1] * size
+    escapes = bytearray(size)
+    parents = {}
+    buckets = {}
+
+    def schedule(index, value, distance):
+        buckets.setdefault(distance, []).append((index, value))
+
+    for turn in (WHITE, BLACK):
+        for pieces in _placements(layout):
+            bitboards = Bitboards()
+            for team, kind, sq in pieces:
+                bitboards.add(team, kind, sq)
+            if bitboards.is_in_check(1 - turn):
+                continue
+            index = position_index(turn, pieces)
+            result[index] = DRAW
+            moves = 0
+            for child in _children(bitboards, pieces, turn):
+                moves += 1
+                child_index = position_index(1 - turn, child)
+                child_name = signature(child)
+                if child_name == name:
+                    parents.setdefault(child_index, []).append(index)
+                    remaining[index] += 1
+                    continue
+                value = solved[child_name][child_index]
+                if value & 3 == LOSS:
+                    schedule(index, WIN, (value >> 2) + 1)
+                elif value & 3 == WIN:
+                    slowest[index] = max(slowest[index], value >> 2)
+                else:
+                    escapes[index] = 1
+            if moves == 0:
+                if bitboards.is_in_check(turn):
+                    schedule(index, LOSS, 0)
+                else:
+                    resolved[index] = 1
+            elif remaining[index] == 0 and not escapes[index]:
+                schedule(index, LOSS, slowest[index] + 1)
+
+    # Resolve positions in order of distance to mate, so the first result a
+    # position receives is the fastest win or the slowest loss.
+    while buckets:
+        distance = min(buckets)
+        for index, value in buckets.pop(distance):
+            if resolved[index]:
+                continue
+            resolved[index] = 1
+            result[index] = value
+            dtm[index] = distance
+            for parent in parents.get(index, ()):
+                if resolved[parent]:
+                    continue
+                if value == LOSS:
+                    schedule(parent, WIN, distance + 1)
+                else:
+                    remaining[parent] -= 1
+                    slowest[parent] = max(slowest[parent], distance)
+                    if remaining[parent] == 0 and not escapes[parent]:
+                        schedule(parent, LOSS, slowest[parent] + 1)
+
+    # Anything never resolved can be held forever by the defending side.
+    table = bytes(value | min(distance, DTM_LIMIT) << 2 if value in (WIN, LOSS) else value
+                  for value, distance in zip(result, dtm))
+    if log:
+        wins = result.count(WIN)
+        losses = result.count(LOSS)
+        draws = result.count(DRAW)
+        log(f"{name}: {wins} wins, {draws} draws, {losses} losses, longest mate {max(dtm)} plies, "
+            f"{time.monotonic() - started:.1f}s")
+    return name, len(layout), table
+
+
+def build(signatures, output, log=None):
+    os.makedirs(output, exist_ok=True)
+    solved = {}
+
+    def ensure(text):
+        layout = parse_signature(text)
+        name = signature([(team, kind, 0) for team, kind in layout])
+        if name in solved:
+            return
+        for dependency in sorted(dependencies(layout)):
+            ensure(dependency)
+        name, piece_count, table = solve(name, solved, log)
+        write_table(os.path.join(output, f"{name}.tb"), piece_count, table)
+        solved[name] = table
+
+    for text in signatures:
+        ensure(text)
+    return sorted(solved)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.build_tablebase',
+                                     description="Build MiniChess endgame tablebases by retrograde analysis")
+    parser.add_argument('signatures', nargs='*', default=DEFAULT_SIGNATURES,
+                        help=f"material such as KRvK or KQvKP; pieces are {LETTERS[:KING]} (default: all 3-piece)")
+    parser.add_argument('--output', default=DEFAULT_TABLEBASES)
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr))
+    names = build(args.signatures, args.output, log)
+    print(f"Wrote {len(names)} tables to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,19 @@
-from fastapi import FastAPI
-from .api.routes import router
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from .api.routes import router, session_manager, search_executor, analysis_pool
+from .services.metrics import metrics
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="MiniChess API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_manager.start()
+    yield
+    search_executor.shutdown()
+    session_manager.shutdown()
+    analysis_pool.shutdown()
+
+app = FastAPI(title="MiniChess API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,3 +23,17 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 app.include_router(router)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by the route template so per-game URLs do not explode the series count.
+        route = request.scope.get("route")
+        metrics.observe_request(request.method, route.path if route else "unmatched", status,
+                                time.perf_counter() - start)
@@ -0,0 +1,89 @@
+import numpy as np
+from .bitboard import WHITE, BLACK, PAWN, KING, PIECE_TYPES, SQUARES, SQUARE_COORDS, KING_ATTACKS
+from .evaluation import MULTIPLIER, PIECE_SQUARE, pseudo_mobility, terminal_score
+from .piece import PIECES
+from ..constants import ROWS, COLS
+
+# Positions are encoded as int8 planes of shape (ROWS, COLS): 0 for an empty
+# square, kind + 1 for a black piece and -(kind + 1) for a white one.
+OFFSET = len(PIECE_TYPES)
+CODES = {None: 0}
+for _color in (WHITE, BLACK):
+    for _kind in range(len(PIECE_TYPES)):
+        CODES[PIECES[_color][_kind]] = (_kind + 1) * MULTIPLIER[_color]
+
+
+def code(color, kind):
+    return (kind + 1) * MULTIPLIER[color]
+
+
+TEAM_SIGNS = np.array(MULTIPLIER)
+PAWN_CODES = np.array([code(WHITE, PAWN), code(BLACK, PAWN)])[:, None, None]
+KING_CODES = np.array([code(WHITE, KING), code(BLACK, KING)])[:, None, None]
+# Piece-square value (material, pawn advancement, centre and knight
+# centralisation) indexed by code + OFFSET and square.
+PSQ_TABLE = np.zeros((2 * OFFSET + 1, SQUARES))
+for _color in (WHITE, BLACK):
+    for _kind in range(len(PIECE_TYPES)):
+        PSQ_TABLE[code(_color, _kind) + OFFSET] = PIECE_SQUARE[_color][_kind]
+SQUARE_INDEX = np.arange(SQUARES)
+FILES = np.array([[SQUARE_COORDS[sq][1] == col for col in range(COLS)] for sq in range(SQUARES)], dtype=np.intp)
+ADJACENT_FILES = np.array([[abs(col - other) == 1 for other in range(COLS)] for col in range(COLS)],
+                          dtype=np.intp)
+NEIGHBOURS = np.array([[KING_ATTACKS[sq] >> other & 1 for other in range(SQUARES)] for sq in range(SQUARES)],
+                      dtype=bool)
+SAME_FILE = np.array([[SQUARE_COORDS[sq][1] == SQUARE_COORDS[other][1] for other in range(SQUARES)]
+                      for sq in range(SQUARES)], dtype=bool)
+
+
+def encode(game_state):
+    # One position's entry in a batch: its piece codes and the mobility and
+    # check terms, which need attack information the planes do not carry.
+    # Finished games are scored straight away and carry no codes.
+    if game_state.game_over:
+        return None, terminal_score(game_state)
+    bitboards = game_state.bitboards
+    score = 0.15 * (pseudo_mobility(bitboards, BLACK) - pseudo_mobility(bitboards, WHITE))
+    if game_state.check['white']:
+        score += 0.7
+    elif game_state.check['black']:
+        score -= 0.7
+    return [CODES[piece] for row in game_state.board for piece in row], score
+
+
+def planes(codes):
+    return np.array(codes, dtype=np.int8).reshape(-1, ROWS, COLS)
+
+
+def static_scores(boards):
+    # Placement terms of evaluation.evaluate for N boards of shape (N, ROWS, COLS)
+    # at once, from black's point of view. Per-team arrays are stacked along a
+    # leading axis of two, white first.
+    flat = boards.reshape(len(boards), SQUARES).astype(np.intp)
+    scores = PSQ_TABLE[flat + OFFSET, SQUARE_INDEX].sum(axis=1)
+
+    pawns = flat == PAWN_CODES
+    files = pawns.astype(np.intp) @ FILES
+    occupied = files > 0
+    isolated = occupied & (occupied.astype(np.intp) @ ADJACENT_FILES == 0)
+    structure = 0.6 * (files > 1).sum(axis=2) + 0.4 * isolated.sum(axis=2)
+    scores -= TEAM_SIGNS @ structure
+
+    kings = flat == KING_CODES
+    king_sq = kings.argmax(axis=2)
+    shelter = (pawns & NEIGHBOURS[king_sq]).sum(axis=2)
+    open_file = ~(pawns.any(axis=0) & SAME_FILE[king_sq]).any(axis=2)
+    both_kings = kings.any(axis=2).all(axis=0)
+    scores += np.where(both_kings, TEAM_SIGNS @ (0.3 * shelter - 0.4 * open_file), 0)
+    return scores
+
+
+def evaluate_encoded(entries):
+    live = [codes for codes, _ in entries if codes is not None]
+    static = iter(static_scores(planes(live)).tolist()) if live else iter(())
+    return [score + next(static) if codes is not None else score for codes, score in entries]
+
+
+def evaluate_batch(game_states):
+    # Scores match evaluation.evaluate for each state, up to float rounding.
+    return evaluate_encoded([encode(game_state) for game_state in game_states])
@@ -0,0 +1,258 @@
+from ..constants import ROWS, COLS
+
+SQUARES = ROWS * COLS
+FULL_MASK = (1 << SQUARES) - 1
+
+WHITE, BLACK = 0, 1
+TEAMS = ('white', 'black')
+TEAM_INDEX = {team: index for index, team in enumerate(TEAMS)}
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_TYPES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+TYPE_INDEX = {kind: index for index, kind in enumerate(PIECE_TYPES)}
+PIECE_VALUES = (1, 3, 3, 5, 9, 1000)
+
+PAWN_DIRECTION = (-1, 1)
+PAWN_START_ROW = (ROWS - 2, 1)
+PROMOTION_ROW = (0, ROWS - 1)
+
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+def square(row, col):
+    return row * COLS + col
+
+
+SQUARE_COORDS = [divmod(sq, COLS) for sq in range(SQUARES)]
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _targets(offsets):
+    table = []
+    for row, col in SQUARE_COORDS:
+        targets = []
+        for dr, dc in offsets:
+            new_row, new_col = row + dr, col + dc
+            if 0 <= new_row < ROWS and 0 <= new_col < COLS:
+                targets.append(square(new_row, new_col))
+        table.append(targets)
+    return table
+
+
+def _mask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+
+KNIGHT_TARGETS = _targets(KNIGHT_OFFSETS)
+KING_TARGETS = _targets(KING_OFFSETS)
+KNIGHT_ATTACKS = [_mask(targets) for targets in KNIGHT_TARGETS]
+KING_ATTACKS = [_mask(targets) for targets in KING_TARGETS]
+PAWN_ATTACKS = (
+    [_mask(targets) for targets in _targets([(-1, -1), (-1, 1)])],
+    [_mask(targets) for targets in _targets([(1, -1), (1, 1)])],
+)
+
+# Ray squares are ordered outward from the origin square. A ray is "forward"
+# when it walks towards higher square indices, so its nearest blocker is the
+# lowest set bit; otherwise it is the highest set bit.
+RAY_SQUARES = {direction: _targets([(direction[0] * i, direction[1] * i) for i in range(1, max(ROWS, COLS))])
+               for direction in BISHOP_DIRECTIONS + ROOK_DIRECTIONS}
+RAY_MASKS = {direction: [_mask(squares) for squares in table] for direction, table in RAY_SQUARES.items()}
+RAY_FORWARD = {direction: direction[0] * COLS + direction[1] > 0 for direction in RAY_SQUARES}
+
+
+def slider_attacks(sq, directions, occupied):
+    attacks = 0
+    for direction in directions:
+        rays = RAY_MASKS[direction]
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            if RAY_FORWARD[direction]:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= rays[blocker]
+        attacks |= ray
+    return attacks
+
+
+def attacks_from(team, kind, sq, occupied):
+    if kind == PAWN:
+        return PAWN_ATTACKS[team][sq]
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if kind == KING:
+        return KING_ATTACKS[sq]
+    if kind == BISHOP:
+        return slider_attacks(sq, BISHOP_DIRECTIONS, occupied)
+    if kind == ROOK:
+        return slider_attacks(sq, ROOK_DIRECTIONS, occupied)
+    return slider_attacks(sq, BISHOP_DIRECTIONS + ROOK_DIRECTIONS, occupied)
+
+
+class Bitboards:
+    def __init__(self):
+        self.pieces = [[0] * len(PIECE_TYPES) for _ in TEAMS]
+        self.occupancy = [0, 0]
+
+    @classmethod
+    def from_board(cls, board):
+        bitboards = cls()
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board[row][col]
+                if piece:
+                    bitboards.add(piece.color, piece.kind, square(row, col))
+        return bitboards
+
+    def add(self, team, kind, sq):
+        bit = 1 << sq
+        self.pieces[team][kind] |= bit
+        self.occupancy[team] |= bit
+
+    def remove(self, team, kind, sq):
+        bit = ~(1 << sq)
+        self.pieces[team][kind] &= bit
+        self.occupancy[team] &= bit
+
+    def king_square(self, team):
+        king = self.pieces[team][KING]
+        return king.bit_length() - 1 if king else None
+
+    def attackers(self, sq, by_team, occupied, exclude=0):
+        pieces = self.pieces[by_team]
+        keep = ~exclude
+        attackers = PAWN_ATTACKS[1 - by_team][sq] & pieces[PAWN]
+        attackers |= KNIGHT_ATTACKS[sq] & pieces[KNIGHT]
+        attackers |= KING_ATTACKS[sq] & pieces[KING]
+        diagonal = (pieces[BISHOP] | pieces[QUEEN]) & keep
+        if diagonal:
+            attackers |= slider_attacks(sq, BISHOP_DIRECTIONS, occupied) & diagonal
+        straight = (pieces[ROOK] | pieces[QUEEN]) & keep
+        if straight:
+            attackers |= slider_attacks(sq, ROOK_DIRECTIONS, occupied) & straight
+        return attackers & keep
+
+    def is_attacked(self, sq, by_team, occupied=None, exclude=0):
+        if occupied is None:
+            occupied = self.occupancy[0] | self.occupancy[1]
+        return self.attackers(sq, by_team, occupied, exclude) != 0
+
+    def is_in_check(self, team):
+        king_sq = self.king_square(team)
+        if king_sq is None:
+            return False
+        return self.is_attacked(king_sq, 1 - team)
+
+    def leaves_king_safe(self, team, kind, from_sq, to_sq):
+        king_sq = to_sq if kind == KING else self.king_square(team)
+        if king_sq is None:
+            return True
+        to_bit = 1 << to_sq
+        occupied = ((self.occupancy[0] | self.occupancy[1]) & ~(1 << from_sq)) | to_bit
+        return not self.is_attacked(king_sq, 1 - team, occupied, exclude=to_bit)
+
+    def gives_check(self, team, kind, from_sq, to_sq):
+        king_sq = self.king_square(1 - team)
+        if king_sq is None:
+            return False
+        if kind == PAWN and SQUARE_COORDS[to_sq][0] == PROMOTION_ROW[team]:
+            kind = QUEEN
+        from_bit = 1 << from_sq
+        occupied = ((self.occupancy[0] | self.occupancy[1]) & ~from_bit) | (1 << to_sq)
+        if attacks_from(team, kind, to_sq, occupied) >> king_sq & 1:
+            return True
+        return self.is_attacked(king_sq, team, occupied, exclude=from_bit)
+
+    def static_exchange(self, team, kind, from_sq, to_sq, captured_kind):
+        # Swap-list SEE: both sides keep recapturing on to_sq with their least
+        # valuable attacker, then the list is folded back assuming either side
+        # may stop capturing when that is better for it.
+        gains = [PIECE_VALUES[captured_kind] if captured_kind is not None else 0]
+        attacker_value = PIECE_VALUES[kind]
+        used = 1 << from_sq
+        occupied = (self.occupancy[0] | self.occupancy[1]) & ~used
+        side = 1 - team
+        while True:
+            attackers = self.attackers(to_sq, side, occupied, exclude=used)
+            if not attackers:
+                break
+            for next_kind in range(len(PIECE_TYPES)):
+                candidates = attackers & self.pieces[side][next_kind]
+                if candidates:
+                    break
+            gains.append(attacker_value - gains[-1])
+            attacker_value = PIECE_VALUES[next_kind]
+            bit = candidates & -candidates
+            used |= bit
+            occupied &= ~bit
+            side = 1 - side
+        for i in range(len(gains) - 1, 0, -1):
+            gains[i - 1] = -max(-gains[i - 1], gains[i])
+        return gains[0]
+
+    def pseudo_targets(self, team, kind, sq):
+        own = self.occupancy[team]
+        if kind == PAWN:
+            return self._pawn_targets(team, sq, own)
+        if kind == KNIGHT:
+            return [target for target in KNIGHT_TARGETS[sq] if not own >> target & 1]
+        if kind == KING:
+            return [target for target in KING_TARGETS[sq] if not own >> target & 1]
+        enemy = self.occupancy[1 - team]
+        if kind == BISHOP:
+            return self._slide(sq, BISHOP_DIRECTIONS, own, enemy)
+        if kind == ROOK:
+            return self._slide(sq, ROOK_DIRECTIONS, own, enemy)
+        return self._slide(sq, BISHOP_DIRECTIONS, own, enemy) + self._slide(sq, ROOK_DIRECTIONS, own, enemy)
+
+    def legal_targets(self, team, kind, sq):
+        return [target for target in self.pseudo_targets(team, kind, sq)
+                if self.leaves_king_safe(team, kind, sq, target)]
+
+    def has_legal_move(self, team):
+        for kind in range(len(PIECE_TYPES)):
+            for sq in iter_bits(self.pieces[team][kind]):
+                for target in self.pseudo_targets(team, kind, sq):
+                    if self.leaves_king_safe(team, kind, sq, target):
+                        return True
+        return False
+
+    def _pawn_targets(self, team, sq, own):
+        targets = []
+        row, col = SQUARE_COORDS[sq]
+        occupied = own | self.occupancy[1 - team]
+        direction = PAWN_DIRECTION[team]
+        if 0 <= row + direction < ROWS:
+            one = sq + direction * COLS
+            if not occupied >> one & 1:
+                targets.append(one)
+                two = one + direction * COLS
+                if row == PAWN_START_ROW[team] and not occupied >> two & 1:
+                    targets.append(two)
+        targets.extend(iter_bits(PAWN_ATTACKS[team][sq] & self.occupancy[1 - team]))
+        return targets
+
+    def _slide(self, sq, directions, own, enemy):
+        targets = []
+        for direction in directions:
+            for target in RAY_SQUARES[direction][sq]:
+                if own >> target & 1:
+                    break
+                targets.append(target)
+                if enemy >> target & 1:
+                    break
+        return targets
@@ -1,48 +1,80 @@
 import random
 import time
-import hashlib
-from copy import deepcopy
+from concurrent.futures import wait
+from .time_manager import TimeManager, SearchTimeout
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER, FLIPPED_BOUND
+from .move_ordering import MoveOrderer
+from .search_stats import SearchStats
+from .tablebase import Tablebase
+from .shared_cache import SharedCache, key_salt
+from .bitboard import WHITE, BLACK, PAWN, KNIGHT, KING
+from .game_state import GameState
+from . import evaluation, batch_evaluation
 from ..constants import ROWS, COLS
 
+DELTA_MARGIN = 2
+# How often a parallel search checks for cancellation while its workers run.
+CANCEL_POLL_SECONDS = 0.02
+# 'batch' scores like 'incremental' but evaluates the children of every
+# depth-1 node together through batch_evaluation.
+EVAL_MODES = ('incremental', 'full', 'batch')
+# Shared cache entries are only reused between engines that score alike.
+CACHE_SALTS = {'incremental': key_salt('incremental'), 'batch': key_salt('incremental'), 'full': key_salt('full')}
+
 class ChessAI:
-    def __init__(self, depth=2):
+    def __init__(self, depth=2, time_ms=5000, tt_size_mb=16, eval_mode='incremental', pool=None,
+                 transposition_table=None, book=None, tablebase=None, on_iteration=None, shared_cache=None):
+        if eval_mode not in EVAL_MODES:
+            raise ValueError(f"Unknown evaluation mode: {eval_mode}")
         self.depth = depth
-        self.killer_moves = {d: [] for d in range(depth + 1)}
-        self.transposition_table = {}
+        self.eval_mode = eval_mode
+        self.pool = pool
+        self.book = book
+        self.tablebase = tablebase
+        self.shared_cache = shared_cache
+        self.cache_salt = CACHE_SALTS[eval_mode]
+        # Called from the searching thread after every completed iteration.
+        self.on_iteration = on_iteration
+        self.nodes = 0
+        self.nodes_per_second = 0
+        self.workers = 1
+        self.cancelled = False
+        self.time_manager = TimeManager(time_ms)
+        self.search_depth = 0
+        self.pv = []
+        self.score = None
+        self.move_orderer = MoveOrderer()
+        self.transposition_table = transposition_table or TranspositionTable(tt_size_mb)
         self.nodes_evaluated = 0
-
-    def _hash_board(self, game_state):
-        board_str = ''
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = game_state.board[row][col]
-                board_str += f"{piece.team}_{piece.type}_{piece.value}" if piece else '0'
-        board_str += game_state.turn
-        return hashlib.md5(board_str.encode()).hexdigest()
+        self.quiescence_nodes = 0
+        self.leaf_scores = {}
+        # Set while a score below the current node rests on a path draw.
+        self.path_draw = False
+        self.stats = SearchStats()
 
     def evaluate_board(self, game_state):
         self.nodes_evaluated += 1
         score = 0
         black_king_pos = None
         white_king_pos = None
-        pawn_counts = {'black': [0] * COLS, 'white': [0] * COLS}
+        pawn_counts = [[0] * COLS, [0] * COLS]
 
         for row in range(ROWS):
             for col in range(COLS):
                 piece = game_state.board[row][col]
                 if piece:
-                    multiplier = 1 if piece.team == 'black' else -1
+                    multiplier = 1 if piece.color == BLACK else -1
                     score += multiplier * piece.value
 
-                    if piece.type == 'king':
-                        if piece.team == 'black':
+                    if piece.kind == KING:
+                        if piece.color == BLACK:
                             black_king_pos = (row, col)
                         else:
                             white_king_pos = (row, col)
 
-                    if piece.type == 'pawn':
-                        pawn_counts[piece.team][col] += 1
-                        if piece.team == 'black':
+                    if piece.kind == PAWN:
+                        pawn_counts[piece.color][col] += 1
+                        if piece.color == BLACK:
                             score += multiplier * 0.2 * row
                         else:
                             score += multiplier * 0.2 * (ROWS - 1 - row)
@@ -52,7 +84,7 @@ class ChessAI:
                     elif 0 <= row <= 5 and 0 <= col <= 4:
                         score += multiplier * 0.05
 
-                    if piece.type == 'knight':
+                    if piece.kind == KNIGHT:
                         center_dist = abs(2.5 - col) + abs(2.5 - row)
                         score += multiplier * (3 - center_dist) * 0.1
 
@@ -60,22 +92,22 @@ class ChessAI:
                     score += multiplier * len(moves) * 0.15
 
         for col in range(COLS):
-            for team in ['black', 'white']:
-                multiplier = 1 if team == 'black' else -1
+            for team in (BLACK, WHITE):
+                multiplier = 1 if team == BLACK else -1
                 if pawn_counts[team][col] > 1:
                     score += multiplier * -0.6
                 if pawn_counts[team][col] > 0 and all(pawn_counts[team][c] == 0 for c in [col-1, col+1] if 0 <= c < COLS):
                     score += multiplier * -0.4
 
         if black_king_pos and white_king_pos:
-            for team, king_pos in [('black', black_king_pos), ('white', white_king_pos)]:
-                multiplier = 1 if team == 'black' else -1
+            for team, king_pos in [(BLACK, black_king_pos), (WHITE, white_king_pos)]:
+                multiplier = 1 if team == BLACK else -1
                 king_row, king_col = king_pos
                 for r in range(king_row - 1, king_row + 2):
                     for c in range(king_col - 1, king_col + 2):
-                        if 0 <= r < ROWS and 0 <= c < COLS and game_state.board[r][c] and game_state.board[r][c].type == 'pawn' and game_state.board[r][c].team == team:
+                        if 0 <= r < ROWS and 0 <= c < COLS and game_state.board[r][c] and game_state.board[r][c].kind == PAWN and game_state.board[r][c].color == team:
                             score += multiplier * 0.3
-                if not any(game_state.board[r][king_col] and game_state.board[r][king_col].type == 'pawn' for r in range(ROWS)):
+                if not any(game_state.board[r][king_col] and game_state.board[r][king_col].kind == PAWN for r in range(ROWS)):
                     score += multiplier * -0.4
 
         if game_state.is_in_check('white'):
@@ -88,59 +120,196 @@ class ChessAI:
                 return float('inf')
             elif game_state.is_checkmate('black'):
                 return -float('inf')
-            elif game_state.is_stalemate(game_state.turn):
-                return 0
+            return 0
 
         return score
 
-    def order_moves(self, game_state, moves, team, depth):
-        def move_score(move):
-            start, end = move
-            score = 0
-
-            target = game_state.board[end[0]][end[1]]
-            if target and target.team != team:
-                score += target.value * 100
-
-            new_state = deepcopy(game_state)
-            new_state.move_piece(start[0], start[1], end[0], end[1])
-            opponent = 'white' if team == 'black' else 'black'
-            if new_state.is_in_check(opponent):
-                score += 70
-            if new_state.is_checkmate(opponent):
-                score += 10000
+    def evaluate_incremental(self, game_state):
+        self.nodes_evaluated += 1
+        return evaluation.evaluate(game_state)
 
-            piece = game_state.board[start[0]][start[1]]
-            if piece.type == 'pawn':
-                if (team == 'black' and end[0] == ROWS - 1) or (team == 'white' and end[0] == 0):
-                    score += 900
+    def _evaluate(self, game_state, team):
+        if self.eval_mode == 'full':
+            score = self.evaluate_board(game_state)
+        else:
+            score = self.evaluate_incremental(game_state)
+        return score if team == 'black' else -score
+
+    def _score_leaves(self, game_state, moves):
+        # Stand-pat scores for every child of a depth-1 node in one vectorized
+        # pass; quiescence picks them up by hash instead of evaluating alone.
+        keys, entries = [], []
+        for start, end in moves:
+            game_state.make_move(start[0], start[1], end[0], end[1])
+            keys.append(game_state.hash)
+            entries.append(batch_evaluation.encode(game_state))
+            game_state.unmake_move()
+        self.leaf_scores = dict(zip(keys, batch_evaluation.evaluate_encoded(entries)))
+
+    def _stand_pat(self, game_state, team):
+        score = self.leaf_scores.pop(game_state.hash, None)
+        if score is None:
+            return self._evaluate(game_state, team)
+        self.nodes_evaluated += 1
+        return score if team == 'black' else -score
 
-            if 1 <= end[0] <= 4 and 1 <= end[1] <= 3:
-                score += 15
+    def quiescence(self, game_state, alpha, beta, team):
+        self.time_manager.check()
+        self.quiescence_nodes += 1
+        stand_pat = self._stand_pat(game_state, team)
+        if game_state.game_over:
+            if game_state.draw and game_state.is_path_draw():
+                self.path_draw = True
+            return stand_pat
 
-            return score
+        maximizing = (team == game_state.turn)
+        in_check = game_state.check[game_state.turn]
+        if in_check:
+            best = float('-inf') if maximizing else float('inf')
+            moves = game_state.get_all_possible_moves(game_state.turn)
+        else:
+            if maximizing:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            best = stand_pat
+            moves = []
+            for start, end in game_state.get_capture_moves(game_state.turn):
+                gain = game_state.static_exchange(start[0], start[1], end[0], end[1])
+                if gain < 0:
+                    continue
+                captured = game_state.board[end[0]][end[1]].value
+                if maximizing and stand_pat + captured + DELTA_MARGIN <= alpha:
+                    continue
+                if not maximizing and stand_pat - captured - DELTA_MARGIN >= beta:
+                    continue
+                moves.append((gain, captured, (start, end)))
+            moves = [move for _, _, move in sorted(moves, key=lambda item: item[:2], reverse=True)]
+
+        for start, end in moves:
+            game_state.make_move(start[0], start[1], end[0], end[1])
+            try:
+                score = self.quiescence(game_state, alpha, beta, team)
+            finally:
+                game_state.unmake_move()
+
+            if maximizing:
+                best = max(best, score)
+                alpha = max(alpha, score)
+            else:
+                best = min(best, score)
+                beta = min(beta, score)
+            if beta <= alpha:
+                break
 
-        ordered_moves = []
+        return best
+
+    def _bound(self, score, alpha, beta):
+        if score <= alpha:
+            return UPPER
+        if score >= beta:
+            return LOWER
+        return EXACT
+
+    def _store(self, board_hash, depth, score, flag, best_move, team):
+        # Entries are kept from black's point of view, like evaluate_board, so
+        # engines playing either side can share one table.
+        if self.path_draw:
+            return
+        if team == 'white':
+            score, flag = -score, FLIPPED_BOUND[flag]
+        self.transposition_table.store(board_hash, depth, score, flag, best_move)
+        if self.shared_cache:
+            self.shared_cache.store(board_hash ^ self.cache_salt, depth, score, flag, best_move)
+
+    def _probe(self, board_hash, team):
+        self.stats.tt_probes += 1
+        entry = self.transposition_table.probe(board_hash)
+        if entry:
+            self.stats.tt_hits += 1
+        elif self.shared_cache:
+            # Fall back to results other games and processes have stored, and
+            # keep a local copy for the rest of this search.
+            entry = self.shared_cache.probe(board_hash ^ self.cache_salt)
+            if entry:
+                self.stats.shared_hits += 1
+                self.transposition_table.store(board_hash, *entry)
+        if entry and team == 'white':
+            depth, score, flag, move = entry
+            entry = depth, -score, FLIPPED_BOUND[flag], move
+        return entry
+
+    def principal_variation(self, game_state, max_length):
+        pv = []
         seen = set()
-        for move in self.killer_moves.get(depth, []):
-            if move in moves and move not in seen:
-                ordered_moves.append(move)
-                seen.add(move)
-
-        for move in moves:
-            if move not in seen:
-                ordered_moves.append(move)
-
-        return sorted(ordered_moves, key=move_score, reverse=True)
+        while len(pv) < max_length and not game_state.game_over and game_state.hash not in seen:
+            seen.add(game_state.hash)
+            entry = self.transposition_table.probe(game_state.hash)
+            if not entry or entry[3] not in game_state.get_all_possible_moves(game_state.turn):
+                break
+            start, end = entry[3]
+            game_state.make_move(start[0], start[1], end[0], end[1])
+            pv.append(entry[3])
+        for _ in pv:
+            game_state.unmake_move()
+        return pv
 
     def minimax(self, game_state, depth, alpha, beta, team):
-        board_hash = self._hash_board(game_state)
-        if board_hash in self.transposition_table and self.transposition_table[board_hash][0] >= depth:
-            return self.transposition_table[board_hash][1], self.transposition_table[board_hash][2]
+        # A score that rests on a path draw anywhere in a node's subtree
+        # depends on how the node was reached, so _store keeps it out of the
+        # transposition table and the shared cache, and the flag is passed on
+        # to every ancestor.
+        path_draw, self.path_draw = self.path_draw, False
+        result = self._minimax(game_state, depth, alpha, beta, team)
+        self.path_draw = self.path_draw or path_draw
+        return result
+
+    def _minimax(self, game_state, depth, alpha, beta, team):
+        self.time_manager.check()
+        if depth < self.search_depth and game_state.is_path_draw():
+            # A cycle back to an earlier position is scored as the draw it can
+            # be forced into.
+            self.stats.repetitions += 1
+            self.path_draw = True
+            return 0, None
+        if self.tablebase and depth < self.search_depth and not game_state.game_over:
+            score = self.tablebase.score(game_state, self.search_depth - depth)
+            if score is not None:
+                self.stats.tb_hits += 1
+                return (score if game_state.turn == team else -score), None
+        board_hash = game_state.hash
+        tt_move = None
+        entry = self._probe(board_hash, team)
+        if entry:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            if entry_depth >= depth:
+                if entry_flag == EXACT:
+                    self.stats.tt_cutoffs += 1
+                    return entry_score, tt_move
+                if entry_flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    self.stats.tt_cutoffs += 1
+                    return entry_score, tt_move
+        if depth == self.search_depth and self.pv:
+            tt_move = self.pv[0]
+        alpha_orig, beta_orig = alpha, beta
+        ply = max(0, self.search_depth - depth)
 
-        if depth == 0 or game_state.game_over:
-            score = self.evaluate_board(game_state)
-            self.transposition_table[board_hash] = (depth, score, None)
+        if game_state.game_over:
+            score = self._evaluate(game_state, team)
+            self._store(board_hash, depth, score, EXACT, None, team)
+            return score, None
+
+        if depth == 0:
+            score = self.quiescence(game_state, alpha, beta, team)
+            self._store(board_hash, depth, score, self._bound(score, alpha, beta), None, team)
             return score, None
 
         best_move = None
@@ -148,12 +317,16 @@ class ChessAI:
         if maximizing:
             max_eval = float('-inf')
             moves = game_state.get_all_possible_moves(team)
-            moves = self.order_moves(game_state, moves, team, depth)
+            moves = self.move_orderer.order(game_state, moves, ply, tt_move)
+            if depth == 1 and self.eval_mode == 'batch':
+                self._score_leaves(game_state, moves)
 
-            for start, end in moves:
-                new_state = deepcopy(game_state)
-                new_state.move_piece(start[0], start[1], end[0], end[1])
-                eval_score, _ = self.minimax(new_state, depth - 1, alpha, beta, team)
+            for index, (start, end) in enumerate(moves):
+                game_state.make_move(start[0], start[1], end[0], end[1])
+                try:
+                    eval_score, _ = self.minimax(game_state, depth - 1, alpha, beta, team)
+                finally:
+                    game_state.unmake_move()
 
                 if eval_score > max_eval:
                     max_eval = eval_score
@@ -161,23 +334,26 @@ class ChessAI:
 
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
-                    if len(self.killer_moves[depth]) < 2 and (start, end) not in self.killer_moves[depth]:
-                        self.killer_moves[depth].append((start, end))
+                    self._record_cutoff(game_state, (start, end), ply, depth, index)
                     break
 
-            self.transposition_table[board_hash] = (depth, max_eval, best_move)
+            self._store(board_hash, depth, max_eval, self._bound(max_eval, alpha_orig, beta_orig), best_move, team)
             return max_eval, best_move
 
         else:
             min_eval = float('inf')
             opponent = 'white' if team == 'black' else 'black'
             moves = game_state.get_all_possible_moves(opponent)
-            moves = self.order_moves(game_state, moves, opponent, depth)
+            moves = self.move_orderer.order(game_state, moves, ply, tt_move)
+            if depth == 1 and self.eval_mode == 'batch':
+                self._score_leaves(game_state, moves)
 
-            for start, end in moves:
-                new_state = deepcopy(game_state)
-                new_state.move_piece(start[0], start[1], end[0], end[1])
-                eval_score, _ = self.minimax(new_state, depth - 1, alpha, beta, team)
+            for index, (start, end) in enumerate(moves):
+                game_state.make_move(start[0], start[1], end[0], end[1])
+                try:
+                    eval_score, _ = self.minimax(game_state, depth - 1, alpha, beta, team)
+                finally:
+                    game_state.unmake_move()
 
                 if eval_score < min_eval:
                     min_eval = eval_score
@@ -185,30 +361,256 @@ class ChessAI:
 
                 beta = min(beta, eval_score)
                 if beta <= alpha:
-                    if len(self.killer_moves[depth]) < 2 and (start, end) not in self.killer_moves[depth]:
-                        self.killer_moves[depth].append((start, end))
+                    self._record_cutoff(game_state, (start, end), ply, depth, index)
                     break
 
-            self.transposition_table[board_hash] = (depth, min_eval, best_move)
+            self._store(board_hash, depth, min_eval, self._bound(min_eval, alpha_orig, beta_orig), best_move, team)
             return min_eval, best_move
 
-    def make_move(self, game_state, team):
-        game_state.ai_thinking = True
+    def _record_cutoff(self, game_state, move, ply, depth, index):
+        self.stats.beta_cutoffs += 1
+        if index == 0:
+            self.stats.first_move_cutoffs += 1
+        self.move_orderer.record_cutoff(game_state, move, ply, depth)
+
+    def search_root_moves(self, game_state, moves, depth, time_ms, stop_slot=None):
+        self.time_manager.time_ms = time_ms
+        self.time_manager.start(stop_slot)
+        self.transposition_table.new_search()
+        self.move_orderer.new_search()
+        self.nodes_evaluated = 0
+        self.quiescence_nodes = 0
+        self.stats.reset()
+        self.search_depth = depth
+        team = game_state.turn
+        best_move, best_score = None, float('-inf')
+        alpha = float('-inf')
+        completed = True
+        try:
+            for start, end in moves:
+                game_state.make_move(start[0], start[1], end[0], end[1])
+                try:
+                    score, _ = self.minimax(game_state, depth - 1, alpha, float('inf'), team)
+                finally:
+                    game_state.unmake_move()
+                if best_move is None or score > best_score:
+                    best_move, best_score = (start, end), score
+                alpha = max(alpha, score)
+        except SearchTimeout:
+            completed = False
+        self.stats.nodes = self.time_manager.nodes
+        self.stats.quiescence_nodes = self.quiescence_nodes
+        return best_move, best_score, self.time_manager.nodes, self.nodes_evaluated, completed, self.stats.counters()
+
+    def _parallel_search(self, game_state, team, depth):
+        moves = game_state.get_all_possible_moves(team)
+        moves = self.move_orderer.order(game_state, moves, 0, self.pv[0] if self.pv else None)
+        workers = max(1, min(self.pool.workers, len(moves)))
+        remaining_ms = max(1, int((self.time_manager.hard_deadline - time.monotonic()) * 1000))
+        # Deal the ordered moves round-robin so every worker starts on a strong candidate.
+        # Workers get the reversible part of the history, which is all that
+        # repetition detection looks at.
+        history = game_state.history[-game_state.halfmove_clock - 1:]
+        stop_slot = self.pool.acquire_stop_slot()
+        futures = []
+        try:
+            futures = [self.pool.submit(search_root_moves, game_state.board, game_state.turn, team,
+                                        moves[i::workers], depth, remaining_ms, self.eval_mode,
+                                        self.tablebase.directory if self.tablebase else None,
+                                        self.shared_cache.path if self.shared_cache else None, history, stop_slot)
+                       for i in range(workers)]
+            pending = futures
+            while pending:
+                _, pending = wait(pending, timeout=CANCEL_POLL_SECONDS)
+                if pending and self.time_manager.stopped:
+                    # Cancelled: stop the workers and return without waiting
+                    # for them to notice.
+                    self.pool.stop(stop_slot, futures)
+                    raise SearchTimeout()
+        finally:
+            self.pool.release_stop_slot(stop_slot, futures)
+        results = [future.result() for future in futures]
+        self.workers = workers
+        self.nodes += sum(result[2] for result in results)
+        self.nodes_evaluated += sum(result[3] for result in results)
+        for result in results:
+            self.stats.merge(result[5])
+        if not all(result[4] for result in results):
+            raise SearchTimeout()
+        best_move, best_score = None, float('-inf')
+        for move, score, _, _, _, _ in results:
+            if move and (best_move is None or score > best_score):
+                best_move, best_score = move, score
+        return best_score, best_move
+
+    def iteration_info(self):
+        iteration = self.stats.iterations[-1]
+        score, mate = score_fields(self.score)
+        return {'depth': iteration['depth'], 'score': score, 'mate': mate, 'pv': list(self.pv),
+                'nodes': iteration['total_nodes'], 'time_ms': iteration['elapsed_ms']}
+
+    def _node_count(self):
+        return self.nodes if self.pool else self.time_manager.nodes
+
+    def cancel(self):
+        self.cancelled = True
+        self.time_manager.stop()
+
+    def search(self, game_state, team):
         self.nodes_evaluated = 0
+        self.quiescence_nodes = 0
+        self.nodes = 0
+        self.workers = 1
+        self.stats.reset()
+        self.transposition_table.new_search()
+        self.transposition_table.reset_stats()
+        self.time_manager.start()
+        if self.cancelled:
+            self.time_manager.stop()
+        self.move_orderer.new_search()
+        self.pv = []
+        self.score = None
         best_move = None
-        start_time = time.time()
-        time_limit = 5.0
+
+        if self.book:
+            best_move = self.book.probe(game_state)
+            if best_move:
+                self.stats.book_hits += 1
+                self.stats.time_ms = self.time_manager.elapsed_ms()
+                self.nodes_per_second = 0
+                self.pv = [best_move]
+                return best_move
+
+        if self.tablebase:
+            best_move = self.tablebase.best_move(game_state)
+            if best_move:
+                self.stats.tb_hits += 1
+                self.score = self.tablebase.score(game_state, 0)
+                self.stats.time_ms = self.time_manager.elapsed_ms()
+                self.nodes_per_second = 0
+                self.pv = [best_move]
+                return best_move
 
         for d in range(1, self.depth + 1):
-            if time.time() - start_time > time_limit:
+            if d > 1 and self.time_manager.soft_expired():
+                break
+            self.search_depth = d
+            try:
+                if self.pool:
+                    score, move = self._parallel_search(game_state, team, d)
+                else:
+                    score, move = self.minimax(game_state, d, float('-inf'), float('inf'), team)
+            except SearchTimeout:
                 break
-            self.killer_moves[d] = []
-            _, move = self.minimax(game_state, d, float('-inf'), float('inf'), team)
             if move:
                 best_move = move
+                self.score = score
+                pv = self.principal_variation(game_state, d) if not self.pool else []
+                self.pv = pv if pv and pv[0] == move else [move]
+            self.stats.end_iteration(d, self.time_manager.elapsed_ms(), self._node_count())
+            if move and self.on_iteration:
+                self.on_iteration(self.iteration_info())
+
+        self.nodes = self._node_count()
+        elapsed = self.time_manager.elapsed_ms() / 1000
+        self.nodes_per_second = self.nodes / elapsed if elapsed > 0 else 0
+        self.stats.nodes = self.nodes
+        self.stats.workers = self.workers
+        if not self.pool:
+            self.stats.quiescence_nodes = self.quiescence_nodes
+        self.stats.time_ms = elapsed * 1000
+
+        if not best_move:
+            moves = game_state.get_all_possible_moves(team)
+            if moves:
+                best_move = moves[0]
+        return best_move
 
+    def make_move(self, game_state, team):
+        game_state.ai_thinking = True
+        best_move = self.search(game_state, team)
         if best_move:
             start, end = best_move
             game_state.move_piece(start[0], start[1], end[0], end[1])
         game_state.ai_thinking = False
-        return best_move
\ No newline at end of file
+        return best_move
+
+
+_worker_engines = {}
+
+
+_worker_caches = {}
+
+
+def _worker_engine(team, eval_mode, tablebase_path, shared_cache_path=None):
+    key = (team, eval_mode, tablebase_path, shared_cache_path)
+    if key not in _worker_engines:
+        # The parent created the cache file, so workers map it at its size.
+        if shared_cache_path and shared_cache_path not in _worker_caches:
+            _worker_caches[shared_cache_path] = SharedCache(shared_cache_path)
+        _worker_engines[key] = ChessAI(eval_mode=eval_mode, tablebase=Tablebase.load(tablebase_path),
+                                       shared_cache=_worker_caches.get(shared_cache_path))
+    return _worker_engines[key]
+
+
+def search_root_moves(board, turn, team, moves, depth, time_ms, eval_mode, tablebase_path=None,
+                      shared_cache_path=None, history=None, stop_slot=None):
+    # Runs inside a search pool worker. Engines are cached per process so their
+    # transposition tables carry over between requests.
+    engine = _worker_engine(team, eval_mode, tablebase_path, shared_cache_path)
+    game_state = GameState(board, turn)
+    if history:
+        game_state.restore_history(history, len(history) - 1)
+    return engine.search_root_moves(game_state, moves, depth, time_ms, stop_slot)
+
+
+def score_fields(score):
+    # Scores are from the point of view of the side to move; a forced mate is
+    # reported as mate=1 for a win and mate=-1 for a loss instead of an
+    # infinite score, which JSON cannot carry.
+    if score in (float('inf'), -float('inf')):
+        return None, 1 if score > 0 else -1
+    return score, None
+
+
+def analyse_position(fen, depth, time_ms, eval_mode, tablebase_path=None):
+    # Runs inside a search pool worker for batch analysis. An invalid
+    # position is reported in the result's error field.
+    try:
+        game_state = GameState.from_fen(fen)
+    except ValueError as e:
+        return {'error': str(e)}
+    engine = _worker_engine(game_state.turn, eval_mode, tablebase_path)
+    result = {'best_move': None, 'score': None, 'mate': None, 'pv': [], 'depth': 0, 'nodes': 0, 'time_ms': 0,
+              'game_over': game_state.game_over, 'message': game_state.message}
+    if game_state.game_over:
+        score = engine._evaluate(game_state, game_state.turn)
+    else:
+        engine.depth = depth
+        engine.time_manager.time_ms = time_ms
+        result['best_move'] = engine.search(game_state, game_state.turn)
+        result.update(pv=engine.pv, depth=engine.stats.depth, nodes=engine.nodes, time_ms=engine.stats.time_ms)
+        score = engine.score
+    result['score'], result['mate'] = score_fields(score)
+    return result
+
+
+def evaluate_positions(fens):
+    # Runs inside a search pool worker for depth-0 batch analysis: a static
+    # evaluation of every valid position in one vectorized pass, no search,
+    # and an error result for each invalid one.
+    started = time.perf_counter()
+    results = [None] * len(fens)
+    game_states = []
+    for i, fen in enumerate(fens):
+        try:
+            game_states.append((i, GameState.from_fen(fen)))
+        except ValueError as e:
+            results[i] = {'error': str(e)}
+    scores = batch_evaluation.evaluate_batch([game_state for _, game_state in game_states])
+    time_ms = (time.perf_counter() - started) * 1000 / len(fens)
+    for (i, game_state), score in zip(game_states, scores):
+        score, mate = score_fields(score if game_state.turn == 'black' else -score)
+        results[i] = {'best_move': None, 'score': score, 'mate': mate, 'pv': [], 'depth': 0, 'nodes': 1,
+                      'time_ms': time_ms, 'game_over': game_state.game_over, 'message': game_state.message}
+    return results
@@ -0,0 +1,107 @@
+from .bitboard import (WHITE, BLACK, PAWN, KNIGHT, KING, PIECE_TYPES, PIECE_VALUES, SQUARES, SQUARE_COORDS,
+                       PAWN_ATTACKS, PAWN_DIRECTION, PAWN_START_ROW, KING_ATTACKS, attacks_from, iter_bits, square)
+from ..constants import ROWS, COLS
+
+# All terms are scored from black's point of view, like ChessAI.evaluate_board.
+MULTIPLIER = (-1, 1)
+
+
+def _piece_square(team, kind, sq):
+    row, col = SQUARE_COORDS[sq]
+    score = PIECE_VALUES[kind]
+    if kind == PAWN:
+        score += 0.2 * (row if team == BLACK else ROWS - 1 - row)
+    score += 0.15 if 1 <= row <= 4 and 1 <= col <= 3 else 0.05
+    if kind == KNIGHT:
+        score += (3 - (abs(2.5 - col) + abs(2.5 - row))) * 0.1
+    return MULTIPLIER[team] * score
+
+
+PIECE_SQUARE = [[[_piece_square(team, kind, sq) for sq in range(SQUARES)]
+                 for kind in range(len(PIECE_TYPES))] for team in (WHITE, BLACK)]
+FILE_MASKS = [sum(1 << square(row, col) for row in range(ROWS)) for col in range(COLS)]
+
+
+def piece_square(piece, sq):
+    return PIECE_SQUARE[piece.color][piece.kind][sq]
+
+
+def initial_terms(board):
+    score = 0
+    pawn_files = [[0] * COLS, [0] * COLS]
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board[row][col]
+            if piece:
+                score += piece_square(piece, square(row, col))
+                if piece.kind == PAWN:
+                    pawn_files[piece.color][col] += 1
+    return score, pawn_files
+
+
+def pawn_structure(pawn_files):
+    score = 0
+    for team in (WHITE, BLACK):
+        files = pawn_files[team]
+        for col in range(COLS):
+            if files[col] > 1:
+                score -= MULTIPLIER[team] * 0.6
+            if files[col] > 0 and (col == 0 or files[col - 1] == 0) and (col == COLS - 1 or files[col + 1] == 0):
+                score -= MULTIPLIER[team] * 0.4
+    return score
+
+
+def pseudo_mobility(bitboards, team):
+    own = bitboards.occupancy[team]
+    enemy = bitboards.occupancy[1 - team]
+    occupied = own | enemy
+    pieces = bitboards.pieces[team]
+    count = 0
+    for sq in iter_bits(pieces[PAWN]):
+        count += (PAWN_ATTACKS[team][sq] & enemy).bit_count()
+        row = SQUARE_COORDS[sq][0]
+        if 0 <= row + PAWN_DIRECTION[team] < ROWS:
+            one = sq + PAWN_DIRECTION[team] * COLS
+            if not occupied >> one & 1:
+                count += 1
+                if row == PAWN_START_ROW[team] and not occupied >> (one + PAWN_DIRECTION[team] * COLS) & 1:
+                    count += 1
+    for kind in range(PAWN + 1, len(PIECE_TYPES)):
+        for sq in iter_bits(pieces[kind]):
+            count += (attacks_from(team, kind, sq, occupied) & ~own).bit_count()
+    return count
+
+
+def king_safety(bitboards):
+    score = 0
+    pawns = bitboards.pieces[WHITE][PAWN] | bitboards.pieces[BLACK][PAWN]
+    for team in (WHITE, BLACK):
+        king_sq = bitboards.king_square(team)
+        score += MULTIPLIER[team] * 0.3 * (KING_ATTACKS[king_sq] & bitboards.pieces[team][PAWN]).bit_count()
+        if not FILE_MASKS[SQUARE_COORDS[king_sq][1]] & pawns:
+            score -= MULTIPLIER[team] * 0.4
+    return score
+
+
+def terminal_score(game_state):
+    # Drawn games (stalemate, repetition, the move rule) score 0 even in check.
+    if game_state.check[game_state.turn] and not game_state.draw:
+        return float('inf') if game_state.turn == 'white' else -float('inf')
+    return 0
+
+
+def evaluate(game_state):
+    if game_state.game_over:
+        return terminal_score(game_state)
+
+    bitboards = game_state.bitboards
+    score = game_state.psq_score + pawn_structure(game_state.pawn_files)
+    score += 0.15 * (pseudo_mobility(bitboards, BLACK) - pseudo_mobility(bitboards, WHITE))
+    if bitboards.pieces[WHITE][KING] and bitboards.pieces[BLACK][KING]:
+        score += king_safety(bitboards)
+
+    if game_state.check['white']:
+        score += 0.7
+    elif game_state.check['black']:
+        score -= 0.7
+    return score
@@ -1,40 +1,133 @@
-from copy import deepcopy
-from .piece import Piece
+from collections import namedtuple
+from .piece import PIECES
+from .bitboard import (Bitboards, WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, TEAM_INDEX, PIECE_TYPES,
+                       PROMOTION_ROW, SQUARE_COORDS, attacks_from, iter_bits, square)
+from .zobrist import BLACK_TO_MOVE, hash_position, piece_key
+from .evaluation import initial_terms, piece_square
 from ..constants import ROWS, COLS
 
+FEN_LETTERS = {'pawn': 'p', 'knight': 'n', 'bishop': 'b', 'rook': 'r', 'queen': 'q', 'king': 'k'}
+FEN_TYPES = {letter: kind for kind, letter in FEN_LETTERS.items()}
+BACK_RANK = (ROOK, KNIGHT, KING, BISHOP, ROOK)
+# A game is drawn when a position occurs for the third time, or after this
+# many moves by each side without a capture or a pawn move.
+DRAW_REPETITIONS = 3
+NO_PROGRESS_MOVES = 25
+NO_PROGRESS_PLIES = 2 * NO_PROGRESS_MOVES
+# Everything unmake_move restores for one move: the move and the pieces it
+# moved and captured, then the state fields it changed.
+UndoRecord = namedtuple('UndoRecord', ('start_row', 'start_col', 'end_row', 'end_col', 'piece', 'captured', 'moved',
+                                       'check', 'turn', 'game_over', 'draw', 'message', 'last_move', 'hash',
+                                       'psq_score', 'position', 'halfmove_clock'))
+
+class PositionInfo:
+    # Everything derived from one placement of the pieces, filled in lazily per
+    # team. A GameState keeps the info of its current position until the hash
+    # changes and restores the previous one on unmake. Move lists are shared
+    # between callers and must not be modified.
+    __slots__ = ('hash', 'check', 'has_moves', 'moves', 'targets', 'attacks')
+    
+    def __init__(self, board_hash, check):
+        self.hash = board_hash
+        self.check = check
+        self.has_moves = [None, None]
+        self.moves = [None, None]
+        self.targets = [None, None]
+        self.attacks = [None, None]
+
 class GameState:
-    def __init__(self):
-        self.board = self.initialize_board()
-        self.turn = 'white'
+    def __init__(self, board=None, turn='white', moved=0):
+        self.board = board if board is not None else self.initialize_board()
+        # Bit per square whose piece has moved at least once.
+        self.moved = moved
+        self.bitboards = Bitboards.from_board(self.board)
+        self.turn = turn
         self.selected_piece = None
         self.valid_moves = []
         self.last_move = None
         self.game_over = False
+        self.draw = False
         self.message = ""
         self.ai_thinking = False
-        self.check = {'white': False, 'black': False}
+        self.undo_stack = []
+        self.hash = hash_position(self.board, self.turn)
+        # Hash of every position reached, this one last, and the plies since
+        # the last capture or pawn move; only positions within that window can
+        # repeat.
+        self.history = [self.hash]
+        self.halfmove_clock = 0
+        self.position = None
+        self.check = self._check_status()
+        self.psq_score, self.pawn_files = initial_terms(self.board)
+        self._update_game_over()
     
     def initialize_board(self):
         board = [[None for _ in range(COLS)] for _ in range(ROWS)]
         
         for col in range(COLS):
-            board[1][col] = Piece('black', 'pawn', 1)
-            board[4][col] = Piece('white', 'pawn', 1)
-        
-        board[0][0] = Piece('black', 'rook', 5)
-        board[0][1] = Piece('black', 'knight', 3)
-        board[0][2] = Piece('black', 'king', 1000)
-        board[0][3] = Piece('black', 'bishop', 3)
-        board[0][4] = Piece('black', 'rook', 5)
-        
-        board[5][0] = Piece('white', 'rook', 5)
-        board[5][1] = Piece('white', 'knight', 3)
-        board[5][2] = Piece('white', 'king', 1000)
-        board[5][3] = Piece('white', 'bishop', 3)
-        board[5][4] = Piece('white', 'rook', 5)
+            board[1][col] = PIECES[BLACK][PAWN]
+            board[4][col] = PIECES[WHITE][PAWN]
+            board[0][col] = PIECES[BLACK][BACK_RANK[col]]
+            board[5][col] = PIECES[WHITE][BACK_RANK[col]]
         
         return board
     
+    @classmethod
+    def from_fen(cls, fen):
+        # Rows from black's back rank (row 0) down, e.g. "rnkbr/ppppp/5/5/PPPPP/RNKBR w".
+        parts = fen.split()
+        rows = parts[0].split('/')
+        turn = {'w': 'white', 'b': 'black'}.get(parts[1] if len(parts) > 1 else 'w')
+        if len(rows) != ROWS or turn is None:
+            raise ValueError(f"Invalid position: {fen}")
+        board = []
+        for text in rows:
+            row = []
+            for char in text:
+                if char.isdigit():
+                    row.extend([None] * int(char))
+                elif char.lower() in FEN_TYPES:
+                    kind = PIECE_TYPES.index(FEN_TYPES[char.lower()])
+                    row.append(PIECES[WHITE if char.isupper() else BLACK][kind])
+                else:
+                    raise ValueError(f"Invalid position: {fen}")
+            if len(row) != COLS:
+                raise ValueError(f"Invalid position: {fen}")
+            board.append(row)
+        # Move generation, check detection and the tablebases all assume one
+        # king per side and no pawn left on its promotion row.
+        pieces = [piece for row in board for piece in row if piece]
+        if any(sum(piece is PIECES[color][KING] for piece in pieces) != 1 for color in (WHITE, BLACK)):
+            raise ValueError(f"Invalid position: {fen} (each side needs exactly one king)")
+        for color in (WHITE, BLACK):
+            if PIECES[color][PAWN] in board[PROMOTION_ROW[color]]:
+                raise ValueError(f"Invalid position: {fen} (pawn on its promotion row)")
+        return cls(board, turn)
+    
+    def to_fen(self):
+        rows = []
+        for row in self.board:
+            text, empty = '', 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text, empty = text + str(empty), 0
+                letter = FEN_LETTERS[piece.type]
+                text += letter.upper() if piece.color == WHITE else letter
+            rows.append(text + (str(empty) if empty else ''))
+        return '/'.join(rows) + (' w' if self.turn == 'white' else ' b')
+    
+    def copy(self):
+        board = [list(row) for row in self.board]
+        state = GameState(board, self.turn, self.moved)
+        state.last_move = self.last_move
+        state.position = self.position
+        state.history = list(self.history)
+        state.halfmove_clock = self.halfmove_clock
+        return state
+    
     def select_piece(self, row, col):
         piece = self.board[row][col]
         if piece and piece.team == self.turn:
@@ -44,290 +137,218 @@ class GameState:
         return False
     
     def move_piece(self, start_row, start_col, end_row, end_col):
+        self.make_move(start_row, start_col, end_row, end_col)
+        # A played move's undo record stays for the rest of the game, so it
+        # drops the cached move lists and attack maps of the position before
+        # it; unmake_move rebuilds them lazily if the move is taken back.
+        self.undo_stack[-1] = self.undo_stack[-1]._replace(position=None)
+        self.selected_piece = None
+        self.valid_moves = []
+    
+    def make_move(self, start_row, start_col, end_row, end_col):
         piece = self.board[start_row][start_col]
-        self.board[end_row][end_col] = piece
+        captured = self.board[end_row][end_col]
+        self.undo_stack.append(UndoRecord(start_row, start_col, end_row, end_col, piece, captured, self.moved,
+                                          self.check, self.turn, self.game_over, self.draw, self.message,
+                                          self.last_move, self.hash, self.psq_score, self.position,
+                                          self.halfmove_clock))
+        
+        start_sq, end_sq = square(start_row, start_col), square(end_row, end_col)
+        if captured:
+            self.bitboards.remove(captured.color, captured.kind, end_sq)
+            self.hash ^= piece_key(captured, end_sq)
+            self.psq_score -= piece_square(captured, end_sq)
+            if captured.kind == PAWN:
+                self.pawn_files[captured.color][end_col] -= 1
+        self.bitboards.remove(piece.color, piece.kind, start_sq)
+        self.hash ^= piece_key(piece, start_sq)
+        self.psq_score -= piece_square(piece, start_sq)
+        self.moved = self.moved & ~(1 << start_sq) | 1 << end_sq
+        
+        promoted = piece
+        if piece.kind == PAWN and end_row == PROMOTION_ROW[piece.color]:
+            promoted = PIECES[piece.color][QUEEN]
+        self.board[end_row][end_col] = promoted
         self.board[start_row][start_col] = None
-        piece.has_moved = True
-        
-        if piece.type == 'pawn':
-            if (piece.team == 'white' and end_row == 0) or (piece.team == 'black' and end_row == ROWS - 1):
-                self.board[end_row][end_col] = Piece(piece.team, 'queen', 9)
+        self.bitboards.add(promoted.color, promoted.kind, end_sq)
+        self.hash ^= piece_key(promoted, end_sq) ^ BLACK_TO_MOVE
+        self.psq_score += piece_square(promoted, end_sq)
+        if piece.kind == PAWN:
+            self._move_pawn_file(piece.color, start_col, end_col if promoted is piece else None)
         
         self.last_move = ((start_row, start_col), (end_row, end_col))
-        self.check = {'white': self.is_in_check('white'), 'black': self.is_in_check('black')}
+        self.halfmove_clock = 0 if captured or piece.kind == PAWN else self.halfmove_clock + 1
+        self.history.append(self.hash)
+        self.check = self._check_status()
         self.turn = 'black' if self.turn == 'white' else 'white'
-        self.selected_piece = None
-        self.valid_moves = []
-        
-        if self.is_checkmate(self.turn):
-            self.game_over = True
-            winner = 'white' if self.turn == 'black' else 'black'
-            self.message = f"Checkmate! {winner.capitalize()} wins!"
-        elif self.is_stalemate(self.turn):
+        self._update_game_over()
+    
+    def _update_game_over(self):
+        if not self.has_legal_move(self.turn):
             self.game_over = True
-            self.message = "Stalemate! Game is a draw."
+            if self.check[self.turn]:
+                winner = 'white' if self.turn == 'black' else 'black'
+                self.message = f"Checkmate! {winner.capitalize()} wins!"
+            else:
+                self.draw = True
+                self.message = "Stalemate! Game is a draw."
+        elif self.repetitions() >= DRAW_REPETITIONS:
+            self.game_over = self.draw = True
+            self.message = "Threefold repetition! Game is a draw."
+        elif self.halfmove_clock >= NO_PROGRESS_PLIES:
+            self.game_over = self.draw = True
+            self.message = f"No capture or pawn move in {NO_PROGRESS_MOVES} moves! Game is a draw."
+    
+    def restore_history(self, history, halfmove_clock):
+        # For a position rebuilt without its moves: the hashes of the positions
+        # since the last capture or pawn move, this one last.
+        self.history = list(history)
+        self.halfmove_clock = halfmove_clock
+        if not self.game_over:
+            self._update_game_over()
+    
+    def repetitions(self):
+        # How often the current position has occurred, counting this time. A
+        # position cannot come back in fewer than four reversible plies.
+        if self.halfmove_clock < 4:
+            return 1
+        return self.history[-self.halfmove_clock - 1:].count(self.hash)
+    
+    def is_path_draw(self):
+        # Draws that depend on how the position was reached, not only on the
+        # position itself: a repeat within the window, or the move rule.
+        return self.repetitions() > 1 or (self.draw and self.halfmove_clock >= NO_PROGRESS_PLIES)
+    
+    def unmake_move(self):
+        record = self.undo_stack.pop()
+        self.history.pop()
+        start_row, start_col, end_row, end_col = record.start_row, record.start_col, record.end_row, record.end_col
+        piece, captured = record.piece, record.captured
+        self.moved = record.moved
+        self.check = record.check
+        self.turn = record.turn
+        self.game_over = record.game_over
+        self.draw = record.draw
+        self.message = record.message
+        self.last_move = record.last_move
+        self.hash = record.hash
+        self.psq_score = record.psq_score
+        self.position = record.position
+        self.halfmove_clock = record.halfmove_clock
+        
+        start_sq, end_sq = square(start_row, start_col), square(end_row, end_col)
+        promoted = self.board[end_row][end_col]
+        self.bitboards.remove(promoted.color, promoted.kind, end_sq)
+        self.bitboards.add(piece.color, piece.kind, start_sq)
+        if captured:
+            self.bitboards.add(captured.color, captured.kind, end_sq)
+        self.board[start_row][start_col] = piece
+        self.board[end_row][end_col] = captured
+        if piece.kind == PAWN:
+            self._move_pawn_file(piece.color, end_col if promoted is piece else None, start_col)
+        if captured and captured.kind == PAWN:
+            self.pawn_files[captured.color][end_col] += 1
+    
+    def _move_pawn_file(self, color, from_col, to_col):
+        files = self.pawn_files[color]
+        if from_col is not None:
+            files[from_col] -= 1
+        if to_col is not None:
+            files[to_col] += 1
+    
+    def _position_info(self):
+        info = self.position
+        if info is None or info.hash != self.hash:
+            info = self.position = PositionInfo(self.hash, (self.bitboards.is_in_check(WHITE),
+                                                            self.bitboards.is_in_check(BLACK)))
+        return info
+    
+    def _check_status(self):
+        check = self._position_info().check
+        return {'white': check[WHITE], 'black': check[BLACK]}
+    
+    def _legal_moves(self, team_index):
+        info = self._position_info()
+        if info.moves[team_index] is None:
+            moves = []
+            targets = {}
+            for sq in iter_bits(self.bitboards.occupancy[team_index]):
+                row, col = SQUARE_COORDS[sq]
+                kind = self.board[row][col].kind
+                squares = [SQUARE_COORDS[target] for target in self.bitboards.legal_targets(team_index, kind, sq)]
+                targets[(row, col)] = squares
+                moves.extend(((row, col), target) for target in squares)
+            info.moves[team_index] = moves
+            info.targets[team_index] = targets
+            info.has_moves[team_index] = bool(moves)
+        return info
     
     def get_valid_moves(self, row, col):
         piece = self.board[row][col]
         if not piece:
             return []
         
-        moves = []
-        if piece.type == 'pawn':
-            moves = self.get_pawn_moves(row, col)
-        elif piece.type == 'knight':
-            moves = self.get_knight_moves(row, col)
-        elif piece.type == 'bishop':
-            moves = self.get_bishop_moves(row, col)
-        elif piece.type == 'rook':
-            moves = self.get_rook_moves(row, col)
-        elif piece.type == 'queen':
-            moves = self.get_queen_moves(row, col)
-        elif piece.type == 'king':
-            moves = self.get_king_moves(row, col)
-        
-        valid_moves = []
-        for move in moves:
-            if not self.would_move_cause_check(row, col, move[0], move[1], piece.team):
-                valid_moves.append(move)
-        
-        return valid_moves
+        return list(self._legal_moves(piece.color).targets[piece.color][(row, col)])
     
-    def get_pawn_moves(self, row, col):
-        moves = []
-        piece = self.board[row][col]
-        direction = -1 if piece.team == 'white' else 1
-        
-        if 0 <= row + direction < ROWS and self.board[row + direction][col] is None:
-            moves.append((row + direction, col))
-            if ((piece.team == 'white' and row == 4) or (piece.team == 'black' and row == 1)) and self.board[row + 2*direction][col] is None:
-                moves.append((row + 2*direction, col))
-        
-        for c_offset in [-1, 1]:
-            if 0 <= col + c_offset < COLS and 0 <= row + direction < ROWS:
-                target = self.board[row + direction][col + c_offset]
-                if target and target.team != piece.team:
-                    moves.append((row + direction, col + c_offset))
-        
-        return moves
+    def get_all_possible_moves(self, team):
+        team_index = TEAM_INDEX[team]
+        return self._legal_moves(team_index).moves[team_index]
     
-    def get_knight_moves(self, row, col):
-        moves = []
-        piece = self.board[row][col]
-        knight_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-        
-        for dr, dc in knight_moves:
-            new_row, new_col = row + dr, col + dc
-            if 0 <= new_row < ROWS and 0 <= new_col < COLS:
-                target = self.board[new_row][new_col]
-                if target is None or target.team != piece.team:
-                    moves.append((new_row, new_col))
-        
-        return moves
+    def has_legal_move(self, team):
+        team_index = TEAM_INDEX[team]
+        info = self._position_info()
+        if info.has_moves[team_index] is None:
+            info.has_moves[team_index] = self.bitboards.has_legal_move(team_index)
+        return info.has_moves[team_index]
     
-    def get_bishop_moves(self, row, col):
-        moves = []
-        piece = self.board[row][col]
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        
-        for dr, dc in directions:
-            for i in range(1, max(ROWS, COLS)):
-                new_row, new_col = row + dr * i, col + dc * i
-                if 0 <= new_row < ROWS and 0 <= new_col < COLS:
-                    target = self.board[new_row][new_col]
-                    if target is None:
-                        moves.append((new_row, new_col))
-                    elif target.team != piece.team:
-                        moves.append((new_row, new_col))
-                        break
-                    else:
-                        break
-                else:
-                    break
-        
-        return moves
-    
-    def get_rook_moves(self, row, col):
-        moves = []
-        piece = self.board[row][col]
-        directions = [(0, -1), (0, 1), (-1, 0), (1, 0)]
-        
-        for dr, dc in directions:
-            for i in range(1, max(ROWS, COLS)):
-                new_row, new_col = row + dr * i, col + dc * i
-                if 0 <= new_row < ROWS and 0 <= new_col < COLS:
-                    target = self.board[new_row][new_col]
-                    if target is None:
-                        moves.append((new_row, new_col))
-                    elif target.team != piece.team:
-                        moves.append((new_row, new_col))
-                        break
-                    else:
-                        break
-                else:
-                    break
-        
-        return moves
+    def attack_map(self, team):
+        team_index = TEAM_INDEX[team]
+        info = self._position_info()
+        if info.attacks[team_index] is None:
+            occupied = self.bitboards.occupancy[WHITE] | self.bitboards.occupancy[BLACK]
+            attacks = 0
+            for kind, pieces in enumerate(self.bitboards.pieces[team_index]):
+                for sq in iter_bits(pieces):
+                    attacks |= attacks_from(team_index, kind, sq, occupied)
+            info.attacks[team_index] = attacks
+        return info.attacks[team_index]
     
-    def get_queen_moves(self, row, col):
-        return self.get_bishop_moves(row, col) + self.get_rook_moves(row, col)
+    def get_capture_moves(self, team):
+        team_index = TEAM_INDEX[team]
+        enemy = self.bitboards.occupancy[1 - team_index]
+        info = self._position_info()
+        if info.moves[team_index] is not None:
+            return [move for move in info.moves[team_index] if enemy >> square(*move[1]) & 1]
+        captures = []
+        for sq in iter_bits(self.bitboards.occupancy[team_index]):
+            row, col = SQUARE_COORDS[sq]
+            kind = self.board[row][col].kind
+            for target in self.bitboards.pseudo_targets(team_index, kind, sq):
+                if enemy >> target & 1 and self.bitboards.leaves_king_safe(team_index, kind, sq, target):
+                    captures.append(((row, col), SQUARE_COORDS[target]))
+        return captures
     
-    def get_king_moves(self, row, col):
-        moves = []
-        piece = self.board[row][col]
-        king_moves = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-        
-        for dr, dc in king_moves:
-            new_row, new_col = row + dr, col + dc
-            if 0 <= new_row < ROWS and 0 <= new_col < COLS:
-                target = self.board[new_row][new_col]
-                if target is None or target.team != piece.team:
-                    moves.append((new_row, new_col))
-        
-        return moves
+    def static_exchange(self, start_row, start_col, end_row, end_col):
+        piece = self.board[start_row][start_col]
+        target = self.board[end_row][end_col]
+        return self.bitboards.static_exchange(piece.color, piece.kind, square(start_row, start_col),
+                                              square(end_row, end_col), target.kind if target else None)
     
-    def get_all_possible_moves(self, team):
-        all_moves = []
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
-                if piece and piece.team == team:
-                    moves = self.get_valid_moves(row, col)
-                    for move in moves:
-                        all_moves.append(((row, col), move))
-        return all_moves
+    def gives_check(self, start_row, start_col, end_row, end_col):
+        piece = self.board[start_row][start_col]
+        return self.bitboards.gives_check(piece.color, piece.kind, square(start_row, start_col),
+                                          square(end_row, end_col))
     
     def would_move_cause_check(self, start_row, start_col, end_row, end_col, team):
-        temp_board = deepcopy(self.board)
-        temp_board[end_row][end_col] = temp_board[start_row][start_col]
-        temp_board[start_row][start_col] = None
-        
-        king_pos = None
-        for r in range(ROWS):
-            for c in range(COLS):
-                piece = temp_board[r][c]
-                if piece and piece.team == team and piece.type == 'king':
-                    king_pos = (r, c)
-                    break
-            if king_pos:
-                break
-        
-        opponent = 'black' if team == 'white' else 'white'
-        for r in range(ROWS):
-            for c in range(COLS):
-                piece = temp_board[r][c]
-                if piece and piece.team == opponent:
-                    if piece.type == 'pawn':
-                        direction = -1 if piece.team == 'white' else 1
-                        for c_offset in [-1, 1]:
-                            if 0 <= r + direction < ROWS and 0 <= c + c_offset < COLS:
-                                if (r + direction, c + c_offset) == king_pos:
-                                    return True
-                    elif self.can_piece_reach(temp_board, r, c, king_pos[0], king_pos[1], piece.type):
-                        return True
-        
-        return False
-    
-    def can_piece_reach(self, board, start_row, start_col, end_row, end_col, piece_type):
-        if piece_type == 'knight':
-            knight_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-            return (end_row - start_row, end_col - start_col) in knight_moves
-        
-        elif piece_type == 'king':
-            dr = abs(end_row - start_row)
-            dc = abs(end_col - start_col)
-            return dr <= 1 and dc <= 1
-        
-        elif piece_type == 'rook':
-            if start_row != end_row and start_col != end_col:
-                return False
-            if start_row == end_row:
-                start_c, end_c = min(start_col, end_col), max(start_col, end_col)
-                for c in range(start_c + 1, end_c):
-                    if board[start_row][c]:
-                        return False
-            else:
-                start_r, end_r = min(start_row, end_row), max(start_row, end_row)
-                for r in range(start_r + 1, end_r):
-                    if board[r][start_col]:
-                        return False
-            return True
-        
-        elif piece_type == 'bishop':
-            dr = abs(end_row - start_row)
-            dc = abs(end_col - start_col)
-            if dr != dc:
-                return False
-            r_dir = 1 if end_row > start_row else -1
-            c_dir = 1 if end_col > start_col else -1
-            r, c = start_row + r_dir, start_col + c_dir
-            while r != end_row and c != end_col:
-                if board[r][c]:
-                    return False
-                r += r_dir
-                c += c_dir
-            return True
-        
-        elif piece_type == 'queen':
-            return (self.can_piece_reach(board, start_row, start_col, end_row, end_col, 'rook') or
-                    self.can_piece_reach(board, start_row, start_col, end_row, end_col, 'bishop'))
-        
-        return False
+        piece = self.board[start_row][start_col]
+        return not self.bitboards.leaves_king_safe(TEAM_INDEX[team], piece.kind,
+                                                   square(start_row, start_col), square(end_row, end_col))
     
     def is_in_check(self, team):
-        king_pos = None
-        for r in range(ROWS):
-            for c in range(COLS):
-                piece = self.board[r][c]
-                if piece and piece.team == team and piece.type == 'king':
-                    king_pos = (r, c)
-                    break
-            if king_pos:
-                break
-        
-        if not king_pos:
-            return False
-        
-        opponent = 'black' if team == 'white' else 'white'
-        for r in range(ROWS):
-            for c in range(COLS):
-                piece = self.board[r][c]
-                if piece and piece.team == opponent:
-                    if piece.type == 'pawn':
-                        direction = -1 if piece.team == 'white' else 1
-                        for c_offset in [-1, 1]:
-                            if 0 <= r + direction < ROWS and 0 <= c + c_offset < COLS:
-                                if (r + direction, c + c_offset) == king_pos:
-                                    return True
-                    elif self.can_piece_reach(self.board, r, c, king_pos[0], king_pos[1], piece.type):
-                        return True
-        
-        return False
+        return self._position_info().check[TEAM_INDEX[team]]
     
     def is_checkmate(self, team):
-        if not self.is_in_check(team):
-            return False
-        
-        for r in range(ROWS):
-            for c in range(COLS):
-                piece = self.board[r][c]
-                if piece and piece.team == team:
-                    valid_moves = self.get_valid_moves(r, c)
-                    if valid_moves:
-                        return False
-        
-        return True
+        return self.is_in_check(team) and not self.has_legal_move(team)
     
     def is_stalemate(self, team):
-        if self.is_in_check(team):
-            return False
-        
-        for r in range(ROWS):
-            for c in range(COLS):
-                piece = self.board[r][c]
-                if piece and piece.team == team:
-                    valid_moves = self.get_valid_moves(r, c)
-                    if valid_moves:
-                        return False
-        
-        return True
+        return not self.is_in_check(team) and not self.has_legal_move(team)
@@ -0,0 +1,77 @@
+from .bitboard import PAWN, PIECE_VALUES, PROMOTION_ROW, SQUARES, TEAM_INDEX, square
+
+TT_MOVE_SCORE = 1 << 30
+GOOD_CAPTURE_SCORE = 1 << 27
+PROMOTION_SCORE = 1 << 26
+KILLER_SCORE = 1 << 25
+CHECK_SCORE = 1 << 24
+BAD_CAPTURE_SCORE = 1 << 23
+HISTORY_LIMIT = 1 << 20
+
+MAX_PLY = 64
+KILLER_SLOTS = 2
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        self.history = [[[0] * SQUARES for _ in range(SQUARES)] for _ in range(2)]
+
+    def new_search(self):
+        for slots in self.killers:
+            slots[:] = [None] * KILLER_SLOTS
+        self._age_history()
+
+    def order(self, game_state, moves, ply, tt_move=None):
+        team = TEAM_INDEX[game_state.turn]
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        scored = [(self.score_move(game_state, move, team, killers, tt_move), move) for move in moves]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def score_move(self, game_state, move, team, killers, tt_move):
+        if move == tt_move:
+            return TT_MOVE_SCORE
+        (start_row, start_col), (end_row, end_col) = move
+        kind = game_state.board[start_row][start_col].kind
+        target = game_state.board[end_row][end_col]
+
+        if target:
+            victim = PIECE_VALUES[target.kind]
+            # Most valuable victim first, least valuable attacker breaks ties.
+            score = victim * 16 - kind
+            if PIECE_VALUES[kind] <= victim or game_state.static_exchange(start_row, start_col, end_row, end_col) >= 0:
+                score += GOOD_CAPTURE_SCORE
+            else:
+                score += BAD_CAPTURE_SCORE
+        elif kind == PAWN and end_row == PROMOTION_ROW[team]:
+            score = PROMOTION_SCORE
+        elif move in killers:
+            score = KILLER_SCORE + KILLER_SLOTS - killers.index(move)
+        else:
+            score = self.history[team][square(start_row, start_col)][square(end_row, end_col)]
+
+        if game_state.gives_check(start_row, start_col, end_row, end_col):
+            score += CHECK_SCORE
+        return score
+
+    def record_cutoff(self, game_state, move, ply, depth):
+        (start_row, start_col), (end_row, end_col) = move
+        if game_state.board[end_row][end_col]:
+            return
+        if ply < MAX_PLY:
+            slots = self.killers[ply]
+            if move != slots[0]:
+                slots[1:] = slots[:-1]
+                slots[0] = move
+        team = game_state.board[start_row][start_col].color
+        history = self.history[team][square(start_row, start_col)]
+        history[square(end_row, end_col)] += depth * depth
+        if history[square(end_row, end_col)] > HISTORY_LIMIT:
+            self._age_history()
+
+    def _age_history(self):
+        for team_history in self.history:
+            for row in team_history:
+                for target in range(SQUARES):
+                    row[target] >>= 1
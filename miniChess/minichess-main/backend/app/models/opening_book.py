@@ -0,0 +1,99 @@
+import mmap
+import os
+import struct
+from .bitboard import SQUARES, SQUARE_COORDS, square
+
+# File layout: a header, then fixed-size records sorted by position hash so a
+# lookup is a binary search straight over the mapped bytes.
+MAGIC = b'MCBK'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+# Position hash, move (from_sq * SQUARES + to_sq), score in centipawns for the
+# side to move and search depth.
+RECORD = struct.Struct('<QHhB')
+SCORE_LIMIT = 32767
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'opening_book.bin')
+
+
+def encode_move(move):
+    (sr, sc), (er, ec) = move
+    return square(sr, sc) * SQUARES + square(er, ec)
+
+
+def decode_move(code):
+    from_sq, to_sq = divmod(code, SQUARES)
+    return SQUARE_COORDS[from_sq], SQUARE_COORDS[to_sq]
+
+
+def encode_score(score):
+    if score == float('inf'):
+        return SCORE_LIMIT
+    if score == -float('inf'):
+        return -SCORE_LIMIT
+    return max(-SCORE_LIMIT + 1, min(SCORE_LIMIT - 1, int(round(score * 100))))
+
+
+def write_book(path, entries):
+    # entries maps position hash -> (move, score, depth).
+    records = sorted(entries.items())
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for key, (move, score, depth) in records:
+            f.write(RECORD.pack(key, encode_move(move), encode_score(score), min(depth, 255)))
+    os.replace(tmp_path, path)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"Opening book {path} is truncated")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        if size != HEADER.size + self.count * RECORD.size:
+            self.data.close()
+            raise ValueError(f"Opening book {path} is truncated")
+
+    @classmethod
+    def load(cls, path):
+        # A missing book is not an error: the engine simply searches every move.
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.data.close()
+
+    def lookup(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD.unpack_from(self.data, HEADER.size + mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            record = RECORD.unpack_from(self.data, HEADER.size + lo * RECORD.size)
+            if record[0] == key:
+                _, code, score, depth = record
+                return decode_move(code), score / 100, depth
+        return None
+
+    def probe(self, game_state):
+        entry = self.lookup(game_state.hash)
+        if entry is None:
+            return None
+        move = entry[0]
+        # Guard against hash collisions with positions the book never saw.
+        if move not in game_state.get_all_possible_moves(game_state.turn):
+            return None
+        return move
@@ -1,11 +1,37 @@
+from .bitboard import TEAMS, PIECE_TYPES, PIECE_VALUES
+
 class Piece:
-    def __init__(self, team, type, value):
-        self.team = team
-        self.type = type
-        self.value = value
-        self.has_moved = False
-    
+    # Pieces are flyweights: one shared instance per team and kind, so a board
+    # holds references only and copying it copies no pieces. color and kind
+    # are the bitboard indices the engine compares; team and type keep the
+    # names the API shows. Whether a piece has moved is board state, kept in
+    # GameState.moved.
+    __slots__ = ('color', 'kind', 'team', 'type', 'value')
+
+    def __init__(self, color, kind):
+        self.color = color
+        self.kind = kind
+        self.team = TEAMS[color]
+        self.type = PIECE_TYPES[kind]
+        self.value = PIECE_VALUES[kind]
+
+    def __reduce__(self):
+        # Unpickle to the shared instance, so boards sent to search workers
+        # stay made of flyweights.
+        return piece, (self.color, self.kind)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     def __repr__(self):
         team_char = 'w' if self.team == 'white' else 'b'
         type_char = self.type[0].upper() if self.type != 'knight' else 'N'
-        return f"{team_char}{type_char}"
\ No newline at end of file
+        return f"{team_char}{type_char}"
+
+PIECES = tuple(tuple(Piece(color, kind) for kind in range(len(PIECE_TYPES))) for color in range(len(TEAMS)))
+
+def piece(color, kind):
+    return PIECES[color][kind]
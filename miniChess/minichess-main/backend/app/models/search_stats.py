@@ -0,0 +1,63 @@
+COUNTERS = ('nodes', 'quiescence_nodes', 'tt_probes', 'tt_hits', 'tt_cutoffs', 'beta_cutoffs', 'first_move_cutoffs',
+            'book_hits', 'tb_hits', 'shared_hits', 'repetitions')
+
+
+class SearchStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.depth = 0
+        self.time_ms = 0
+        self.workers = 1
+        self.iterations = []
+
+    def counters(self):
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def merge(self, counters):
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + counters[name])
+
+    def end_iteration(self, depth, elapsed_ms, nodes):
+        # elapsed_ms and nodes are running totals; each iteration keeps its own share.
+        previous = self.iterations[-1] if self.iterations else {'elapsed_ms': 0, 'total_nodes': 0}
+        self.iterations.append({
+            'depth': depth,
+            'time_ms': elapsed_ms - previous['elapsed_ms'],
+            'elapsed_ms': elapsed_ms,
+            'nodes': nodes - previous['total_nodes'],
+            'total_nodes': nodes,
+        })
+        self.depth = depth
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else None
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes * 1000 / self.time_ms if self.time_ms > 0 else 0
+
+    @property
+    def branching_factor(self):
+        # Effective branching factor: how much the last completed iteration
+        # grew over the one before it.
+        if len(self.iterations) < 2 or not self.iterations[-2]['nodes']:
+            return None
+        return self.iterations[-1]['nodes'] / self.iterations[-2]['nodes']
+
+    def as_dict(self):
+        stats = self.counters()
+        stats.update({
+            'depth': self.depth,
+            'time_ms': self.time_ms,
+            'workers': self.workers,
+            'iterations': list(self.iterations),
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'nodes_per_second': self.nodes_per_second,
+            'branching_factor': self.branching_factor,
+        })
+        return stats
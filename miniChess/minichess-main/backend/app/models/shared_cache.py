@@ -0,0 +1,144 @@
+import hashlib
+import mmap
+import os
+import struct
+from .bitboard import SQUARES, SQUARE_COORDS, square
+
+# A transposition cache in a memory-mapped file, so every process that maps
+# the same path (uvicorn workers, search pool workers) reads and extends one
+# table, and it survives restarts. Slots are written without locks: each
+# holds key ^ data next to data, and a reader only trusts a slot whose two
+# words agree, so a slot torn by a concurrent write reads as a miss.
+MAGIC = b'MCTT'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+SLOT = struct.Struct('<QQ')
+BUCKET_SIZE = 4
+FLOAT = struct.Struct('<f')
+MASK64 = (1 << 64) - 1
+DEFAULT_MIN_DEPTH = 2
+
+# data: score as float32 bits (0-31), depth (32-39), bound flag (40-41) and
+# move (42-51, from_sq * SQUARES + to_sq + 1, 0 for none).
+
+
+def key_salt(name):
+    # Engines whose scores are not interchangeable mix a different salt into
+    # their keys, so they never read each other's entries.
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'little')
+
+
+def _pack(depth, score, flag, move):
+    code = 0
+    if move:
+        (sr, sc), (er, ec) = move
+        code = square(sr, sc) * SQUARES + square(er, ec) + 1
+    return int.from_bytes(FLOAT.pack(score), 'little') | min(depth, 255) << 32 | flag << 40 | code << 42
+
+
+def _unpack(data):
+    score = FLOAT.unpack((data & 0xFFFFFFFF).to_bytes(4, 'little'))[0]
+    code = data >> 42 & 0x3FF
+    move = None
+    if code:
+        from_sq, to_sq = divmod(code - 1, SQUARES)
+        move = (SQUARE_COORDS[from_sq], SQUARE_COORDS[to_sq])
+    return data >> 32 & 0xFF, score, data >> 40 & 3, move
+
+
+class SharedCache:
+    def __init__(self, path, size_mb=64, min_depth=DEFAULT_MIN_DEPTH):
+        self.path = path
+        self.min_depth = min_depth
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        slots = max(BUCKET_SIZE, int(size_mb * 1024 * 1024) // SLOT.size // BUCKET_SIZE * BUCKET_SIZE)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # An existing file keeps its own size, so processes started with
+            # different settings still agree on the layout.
+            if os.fstat(fd).st_size < HEADER.size:
+                os.ftruncate(fd, HEADER.size + slots * SLOT.size)
+                os.pwrite(fd, HEADER.pack(MAGIC, VERSION, slots), 0)
+            self.data = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        magic, version, self.slots = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or len(self.data) != HEADER.size + self.slots * SLOT.size:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} search cache")
+        self.buckets = self.slots // BUCKET_SIZE
+
+    @classmethod
+    def load(cls, path, size_mb=64, warm_path=None):
+        if not path:
+            return None
+        cache = cls(path, size_mb)
+        if warm_path and os.path.exists(warm_path):
+            cache.warm(warm_path)
+        return cache
+
+    @property
+    def size_mb(self):
+        return len(self.data) / (1024 * 1024)
+
+    def close(self):
+        self.data.close()
+
+    def _offset(self, key):
+        return HEADER.size + (key % self.buckets) * BUCKET_SIZE * SLOT.size
+
+    def probe(self, key):
+        self.probes += 1
+        offset = self._offset(key)
+        for _ in range(BUCKET_SIZE):
+            check, data = SLOT.unpack_from(self.data, offset)
+            if data and check ^ data == key:
+                self.hits += 1
+                return _unpack(data)
+            offset += SLOT.size
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        # Results shallower than min_depth are cheap to recompute and would
+        # only churn a table shared by every process.
+        if depth < self.min_depth:
+            return
+        offset = self._offset(key)
+        victim, victim_depth = None, None
+        for _ in range(BUCKET_SIZE):
+            check, data = SLOT.unpack_from(self.data, offset)
+            if data and check ^ data == key:
+                if depth < data >> 32 & 0xFF:
+                    return
+                victim = offset
+                break
+            # Otherwise replace the shallowest entry, empty slots first.
+            slot_depth = data >> 32 & 0xFF if data else -1
+            if victim is None or slot_depth < victim_depth:
+                victim, victim_depth = offset, slot_depth
+            offset += SLOT.size
+        data = _pack(depth, score, flag, move)
+        SLOT.pack_into(self.data, victim, (key ^ data) & MASK64, data)
+        self.stores += 1
+
+    def entries(self):
+        for check, data in SLOT.iter_unpack(memoryview(self.data)[HEADER.size:]):
+            if data:
+                yield check ^ data, data
+
+    def warm(self, path):
+        # Merge a prebuilt cache file; deeper entries win as in store().
+        if os.path.abspath(path) == os.path.abspath(self.path):
+            return
+        source = SharedCache(path)
+        try:
+            for key, data in source.entries():
+                self.store(key, *_unpack(data))
+        finally:
+            source.close()
+
+    def stats(self):
+        return {'size_mb': self.size_mb, 'slots': self.slots, 'probes': self.probes, 'hits': self.hits,
+                'stores': self.stores}
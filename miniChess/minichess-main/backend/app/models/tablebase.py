@@ -0,0 +1,152 @@
+import mmap
+import os
+import struct
+from .bitboard import WHITE, BLACK, KING, PIECE_TYPES, SQUARES, TEAM_INDEX, iter_bits
+
+# One file per material signature: a header, then one byte for every
+# (side to move, square of each piece) index. The low two bits hold the
+# result for the side to move, the upper six the distance to mate in plies.
+MAGIC = b'MCTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHB')
+DRAW, WIN, LOSS, INVALID = 0, 1, 2, 3
+DTM_LIMIT = 63
+LETTERS = 'PNBRQK'
+DEFAULT_TABLEBASES = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'tablebases')
+
+# Tablebase wins outrank every heuristic evaluation but stay below a mate the
+# search finds on the board itself.
+TB_WIN = 10000
+
+
+def canonical(pieces):
+    # Kings first, then each side's other pieces strongest first, so every
+    # arrangement of the same material maps to one signature and layout.
+    kings = sorted(piece for piece in pieces if piece[1] == KING)
+    others = sorted((piece for piece in pieces if piece[1] != KING), key=lambda piece: (piece[0], -piece[1]))
+    return kings + others
+
+
+def signature(pieces):
+    sides = ['K', 'K']
+    for team, kind, _ in pieces:
+        if kind != KING:
+            sides[team] += LETTERS[kind]
+    return 'v'.join(sides)
+
+
+def parse_signature(text):
+    white, black = text.upper().split('V')
+    if not (white.startswith('K') and black.startswith('K')):
+        raise ValueError(f"Signature {text} must name both kings first")
+    layout = [(WHITE, KING), (BLACK, KING)]
+    for team, letters in ((WHITE, white[1:]), (BLACK, black[1:])):
+        for letter in letters:
+            if letter not in LETTERS[:KING]:
+                raise ValueError(f"Unknown piece {letter} in signature {text}")
+            layout.append((team, LETTERS.index(letter)))
+    pieces = canonical([(team, kind, 0) for team, kind in layout])
+    return [(team, kind) for team, kind, _ in pieces]
+
+
+def position_index(turn, pieces):
+    index = turn
+    for _, _, sq in pieces:
+        index = index * SQUARES + sq
+    return index
+
+
+def table_size(piece_count):
+    return 2 * SQUARES ** piece_count
+
+
+def pieces_of(bitboards):
+    pieces = []
+    for team in (WHITE, BLACK):
+        for kind in range(len(PIECE_TYPES)):
+            for sq in iter_bits(bitboards.pieces[team][kind]):
+                pieces.append((team, kind, sq))
+    return canonical(pieces)
+
+
+def write_table(path, piece_count, values):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, piece_count))
+        f.write(values)
+    os.replace(tmp_path, path)
+
+
+class Tablebase:
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}
+        self.max_pieces = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.tb'):
+                self._open(os.path.join(directory, name), name[:-3])
+
+    @classmethod
+    def load(cls, directory):
+        # Like the opening book, missing tables only mean the engine searches.
+        if not directory or not os.path.isdir(directory):
+            return None
+        tablebase = cls(directory)
+        return tablebase if tablebase.tables else None
+
+    def _open(self, path, name):
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, piece_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or len(data) != HEADER.size + table_size(piece_count):
+            data.close()
+            raise ValueError(f"{path} is not a version {VERSION} tablebase")
+        self.tables[name] = data
+        self.max_pieces = max(self.max_pieces, piece_count)
+
+    def probe(self, bitboards, turn):
+        if (bitboards.occupancy[WHITE] | bitboards.occupancy[BLACK]).bit_count() > self.max_pieces:
+            return None
+        pieces = pieces_of(bitboards)
+        table = self.tables.get(signature(pieces))
+        if table is None:
+            return None
+        value = table[HEADER.size + position_index(turn, pieces)]
+        if value & 3 == INVALID:
+            return None
+        return value & 3, value >> 2
+
+    def score(self, game_state, ply):
+        # Score for the side to move; nearer mates score higher so the engine
+        # makes progress instead of shuffling between won positions.
+        entry = self.probe(game_state.bitboards, TEAM_INDEX[game_state.turn])
+        if entry is None:
+            return None
+        result, dtm = entry
+        if result == DRAW:
+            return 0
+        score = TB_WIN - ply - dtm
+        return score if result == WIN else -score
+
+    def best_move(self, game_state):
+        best_move, best_rank = None, None
+        for start, end in game_state.get_all_possible_moves(game_state.turn):
+            game_state.make_move(start[0], start[1], end[0], end[1])
+            try:
+                entry = self.probe(game_state.bitboards, TEAM_INDEX[game_state.turn])
+            finally:
+                game_state.unmake_move()
+            if entry is None:
+                return None
+            result, dtm = entry
+            # The entry is for the opponent: their loss is our win.
+            if result == LOSS:
+                rank = (2, -dtm)
+            elif result == DRAW:
+                rank = (1, 0)
+            else:
+                rank = (0, dtm)
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank = (start, end), rank
+        return best_move
+
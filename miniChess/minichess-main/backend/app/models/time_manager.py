@@ -0,0 +1,48 @@
+import time
+
+# Stop flags shared with the parent process, one slot per parallel search.
+# Search pool workers install them at start-up; a worker searching for slot n
+# gives up as soon as the parent sets flag n.
+_stop_flags = None
+
+def install_stop_flags(flags):
+    global _stop_flags
+    _stop_flags = flags
+
+class SearchTimeout(Exception):
+    pass
+
+class TimeManager:
+    def __init__(self, time_ms=5000, soft_ratio=0.5, check_interval=64):
+        self.time_ms = time_ms
+        self.soft_ratio = soft_ratio
+        self.check_interval = check_interval
+        self.start()
+
+    def start(self, stop_slot=None):
+        # Engines are reused between searches, so every search names its own
+        # stop slot, or none, and never inherits the last one's.
+        self.stop_slot = stop_slot
+        now = time.monotonic()
+        self.start_time = now
+        self.soft_deadline = now + self.time_ms * self.soft_ratio / 1000
+        self.hard_deadline = now + self.time_ms / 1000
+        self.nodes = 0
+        self.stopped = False
+
+    def elapsed_ms(self):
+        return (time.monotonic() - self.start_time) * 1000
+
+    def soft_expired(self):
+        return self.stopped or time.monotonic() >= self.soft_deadline
+
+    def stop(self):
+        self.stopped = True
+
+    def check(self):
+        self.nodes += 1
+        if self.nodes % self.check_interval == 0:
+            if (self.stopped or time.monotonic() >= self.hard_deadline
+                    or (self.stop_slot is not None and _stop_flags[self.stop_slot])):
+                self.stopped = True
+                raise SearchTimeout()
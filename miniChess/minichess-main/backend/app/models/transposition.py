@@ -0,0 +1,81 @@
+EXACT, LOWER, UPPER = 0, 1, 2
+FLIPPED_BOUND = (EXACT, UPPER, LOWER)
+
+# Rough per-slot footprint of the parallel lists plus the boxed key, score and
+# move objects they reference. Only used to turn a megabyte budget into a
+# slot count.
+ENTRY_BYTES = 160
+BUCKET_SIZE = 2
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.bucket_count = max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        slots = self.bucket_count * BUCKET_SIZE
+        self.keys = [None] * slots
+        self.depths = [0] * slots
+        self.scores = [0] * slots
+        self.flags = [EXACT] * slots
+        self.moves = [None] * slots
+        self.ages = [0] * slots
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        self.probes += 1
+        index = (key % self.bucket_count) * BUCKET_SIZE
+        keys = self.keys
+        for slot in (index, index + 1):
+            if keys[slot] == key:
+                entry = self.depths[slot], self.scores[slot], self.flags[slot], self.moves[slot]
+                # Re-check the key: a table shared between search threads may
+                # have been rewritten while the fields were being read.
+                if keys[slot] == key:
+                    self.hits += 1
+                    return entry
+        if keys[index] is not None or keys[index + 1] is not None:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        self.stores += 1
+        slot = (key % self.bucket_count) * BUCKET_SIZE
+        # The first slot of a bucket keeps the deepest result of the current
+        # search; anything it rejects goes to the always-replace slot.
+        resident = self.keys[slot]
+        if not (resident is None or resident == key or depth >= self.depths[slot]
+                or self.ages[slot] != self.generation):
+            slot += 1
+        self.keys[slot] = None
+        self.depths[slot] = depth
+        self.scores[slot] = score
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.ages[slot] = self.generation
+        self.keys[slot] = key
+
+    def stats(self):
+        return {
+            'size_mb': self.size_mb,
+            'slots': len(self.keys),
+            'probes': self.probes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+        }
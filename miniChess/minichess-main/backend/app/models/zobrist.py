@@ -0,0 +1,24 @@
+import random
+from .bitboard import TEAMS, PIECE_TYPES, SQUARES, square
+from ..constants import ROWS, COLS
+
+# A fixed seed keeps keys identical across processes and restarts, so hashes
+# can be shared between workers and stored on disk.
+_rng = random.Random(0x6D696E6963686573)
+
+PIECE_KEYS = [[[_rng.getrandbits(64) for _ in range(SQUARES)] for _ in PIECE_TYPES] for _ in TEAMS]
+BLACK_TO_MOVE = _rng.getrandbits(64)
+
+
+def piece_key(piece, sq):
+    return PIECE_KEYS[piece.color][piece.kind][sq]
+
+
+def hash_position(board, turn):
+    key = BLACK_TO_MOVE if turn == 'black' else 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board[row][col]
+            if piece:
+                key ^= piece_key(piece, square(row, col))
+    return key
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Optional, List, Tuple
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+class BatchAnalysisRequest(BaseModel):
+    positions: List[str]
+    depth: int = 4
+    time_ms: int = 5000
+
+class AnalysisResultSchema(BaseModel):
+    index: int
+    fen: str
+    best_move: Optional[Move] = None
+    score: Optional[float] = None
+    mate: Optional[int] = None
+    pv: List[Move] = []
+    depth: int = 0
+    nodes: int = 0
+    time_ms: float = 0
+    game_over: bool = False
+    message: str = ""
+    error: Optional[str] = None
@@ -1,6 +1,8 @@
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional, List, Tuple, Dict
+from ..constants import COLS
+from ..models.game_state import FEN_LETTERS
 
 class PieceSchema(BaseModel):
     team: str
@@ -20,7 +22,35 @@ class MoveSchema(BaseModel):
     end_row: int
     end_col: int
 
+class SearchIterationSchema(BaseModel):
+    depth: int
+    time_ms: float
+    elapsed_ms: float
+    nodes: int
+    total_nodes: int
+
+class SearchStatsSchema(BaseModel):
+    nodes: int
+    quiescence_nodes: int
+    tt_probes: int
+    tt_hits: int
+    tt_cutoffs: int
+    beta_cutoffs: int
+    first_move_cutoffs: int
+    book_hits: int
+    tb_hits: int
+    shared_hits: int
+    repetitions: int
+    first_move_cutoff_rate: Optional[float] = None
+    depth: int
+    time_ms: float
+    iterations: List[SearchIterationSchema]
+    nodes_per_second: float
+    branching_factor: Optional[float] = None
+    workers: int
+
 class GameStateSchema(BaseModel):
+    game_id: Optional[str] = None
     board: List[List[Optional[PieceSchema]]]
     turn: str
     selected_piece: Optional[Tuple[int, int]]
@@ -31,6 +61,65 @@ class GameStateSchema(BaseModel):
     ai_thinking: bool
     check: Dict[str, bool]
     nodes_evaluated: Optional[int] = None
+    nodes_per_second: Optional[float] = None
+    workers: Optional[int] = None
+    search_stats: Optional[SearchStatsSchema] = None
 
     class Config:
         from_attributes = True
+
+    @model_validator(mode="before")
+    @classmethod
+    def _read_game_state(cls, data):
+        # Pieces are shared flyweights, so has_moved comes from the state's
+        # moved mask instead of the pieces themselves.
+        if not hasattr(data, "moved"):
+            return data
+        fields = {name: getattr(data, name) for name in cls.model_fields if hasattr(data, name)}
+        fields["board"] = [[{"team": piece.team, "type": piece.type, "value": piece.value,
+                             "has_moved": bool(data.moved >> (row * COLS + col) & 1)} if piece else None
+                            for col, piece in enumerate(pieces)]
+                           for row, pieces in enumerate(data.board)]
+        return fields
+
+def _square(position: Optional[Tuple[int, int]]) -> Optional[int]:
+    return position[0] * COLS + position[1] if position else None
+
+def compact_move(move) -> Optional[List[int]]:
+    return [_square(move[0]), _square(move[1])] if move else None
+
+def compact_state(game_state, game_id: Optional[str] = None) -> dict:
+    # Compact wire format: the board is a row-major string with FEN letters
+    # (upper case white, "." empty), squares are row * COLS + col and
+    # has_moved is a bit mask over squares.
+    board = []
+    for row in game_state.board:
+        for piece in row:
+            if piece is None:
+                board.append(".")
+                continue
+            letter = FEN_LETTERS[piece.type]
+            board.append(letter.upper() if piece.team == "white" else letter)
+    return {
+        "game_id": game_id,
+        "board": "".join(board),
+        "moved": game_state.moved,
+        "turn": game_state.turn[0],
+        "selected": _square(game_state.selected_piece),
+        "moves": [_square(move) for move in game_state.valid_moves],
+        "last": compact_move(game_state.last_move),
+        "over": game_state.game_over,
+        "msg": game_state.message,
+        "thinking": game_state.ai_thinking,
+        "check": [game_state.check["white"], game_state.check["black"]],
+    }
+
+def state_diff(previous: dict, current: dict) -> dict:
+    # Changed fields of two compact states, with the board reduced to the
+    # squares whose occupant changed as [square, letter] pairs.
+    diff = {key: value for key, value in current.items() if key != "board" and previous.get(key) != value}
+    squares = [[sq, letter] for sq, (old, letter) in enumerate(zip(previous["board"], current["board"]))
+               if old != letter]
+    if squares:
+        diff["squares"] = squares
+    return diff
@@ -0,0 +1,74 @@
+import asyncio
+from typing import AsyncIterator, List, Tuple
+from ..models.chess_ai import analyse_position, evaluate_positions
+from ..schemas.analysis import AnalysisResultSchema
+from .search_pool import SearchPool
+
+# Depth 0 asks for a static evaluation only; those positions go to the
+# workers in chunks of this size and are scored by the batch evaluator.
+STATIC_CHUNK = 256
+
+class AnalysisService:
+    def __init__(self, search_pool: SearchPool, tablebase_path: str = None, eval_mode: str = "incremental",
+                 max_in_flight: int = None):
+        self.search_pool = search_pool
+        self.tablebase_path = tablebase_path
+        self.eval_mode = eval_mode
+        self.max_in_flight = max_in_flight
+
+    async def stream(self, positions: List[str], depth: int, time_ms: int) -> AsyncIterator[str]:
+        # Only a couple of positions per worker are handed to the pool at a
+        # time, so a huge batch neither floods the pool's queue nor keeps
+        # running long after its client has gone away.
+        limit = self.max_in_flight or self.search_pool.workers * 2
+        jobs = self._jobs(positions, depth)
+        pending = {}
+        try:
+            while True:
+                while len(pending) < limit:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    future = self._submit(job, depth, time_ms)
+                    pending[asyncio.wrap_future(future)] = (job, future)
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in done:
+                    job, _ = pending.pop(waiter)
+                    try:
+                        results = waiter.result()
+                        results = results if depth == 0 else [results]
+                        lines = [AnalysisResultSchema(index=index, fen=fen, **result)
+                                 for (index, fen), result in zip(job, results)]
+                    except Exception as e:
+                        lines = [AnalysisResultSchema(index=index, fen=fen, error=f"Analysis failed: {e}")
+                                 for index, fen in job]
+                    for result in lines:
+                        yield self._line(result)
+        finally:
+            for _, future in pending.values():
+                future.cancel()
+
+    def _jobs(self, positions: List[str], depth: int):
+        # Yields lists of (index, fen): one position per search, STATIC_CHUNK
+        # per static evaluation. Positions are parsed, and invalid ones
+        # reported, by the workers, so nothing here blocks the event loop.
+        size = STATIC_CHUNK if depth == 0 else 1
+        job = []
+        for index, fen in enumerate(positions):
+            job.append((index, fen))
+            if len(job) == size:
+                yield job
+                job = []
+        if job:
+            yield job
+
+    def _submit(self, job: List[Tuple[int, str]], depth: int, time_ms: int):
+        if depth == 0:
+            return self.search_pool.submit(evaluate_positions, [fen for _, fen in job])
+        return self.search_pool.submit(analyse_position, job[0][1], depth, time_ms, self.eval_mode,
+                                       self.tablebase_path)
+
+    def _line(self, result: AnalysisResultSchema) -> str:
+        return result.model_dump_json() + "\n"
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+# Sent in place of further events once a subscriber falls this far behind;
+# the client reconnects and starts again from a fresh snapshot.
+LAGGED = None
+
+class EventBroker:
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        # Must be called from the event loop that will consume the queue.
+        queue = asyncio.Queue()
+        with self.lock:
+            self.subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    def publish(self, event: str):
+        # Safe to call from any thread: delivery is handed to each
+        # subscriber's own loop rather than touching its queue directly.
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # The loop has closed under a subscriber that never unsubscribed.
+                self.unsubscribe(queue)
+
+    def _deliver(self, queue: asyncio.Queue, event: str):
+        if queue.qsize() >= self.max_queue:
+            self.unsubscribe(queue)
+            event = LAGGED
+        queue.put_nowait(event)
@@ -1,84 +1,294 @@
+import json
+import threading
 from ..models.game_state import GameState
-from ..models.chess_ai import ChessAI
-from ..schemas.game import GameStateSchema
+from ..models.zobrist import hash_position
+from ..models.bitboard import SQUARE_COORDS, square
+from ..models.chess_ai import ChessAI, score_fields
+from ..models.transposition import TranspositionTable
+from ..models.opening_book import OpeningBook
+from ..models.tablebase import Tablebase
+from ..models.shared_cache import SharedCache
+from ..schemas.game import GameStateSchema, SearchStatsSchema, compact_move, compact_state, state_diff
+from .event_broker import EventBroker
+from .game_store import SavedGame, StoreWriter
+from .search_pool import SearchPool
+from .metrics import metrics
+
+FULL_FORMAT, COMPACT_FORMAT = "full", "compact"
+# A snapshot every this many plies bounds how much of the move log a resume replays.
+SNAPSHOT_INTERVAL = 16
 
 class GameService:
-    def __init__(self):
+    def __init__(self, game_id: str = None, search_pool: SearchPool = None, tt_size_mb: float = 16,
+                 transposition_table: TranspositionTable = None, book: OpeningBook = None,
+                 tablebase: Tablebase = None, journal: StoreWriter = None, shared_cache: SharedCache = None):
+        self.game_id = game_id
+        self.search_pool = search_pool
+        self.tt_size_mb = tt_size_mb
+        self.transposition_table = transposition_table
+        self.book = book
+        self.tablebase = tablebase
+        self.journal = journal
+        self.shared_cache = shared_cache
         self.game_state = GameState()
         self.chess_ai_white = None
-        self.chess_ai_black = ChessAI(depth=2)
+        self.chess_ai_black = None
         self.mode = "ai"
         self.ai_depth_white = 2
         self.ai_depth_black = 2
+        self.time_ms = 5000
+        self.lock = threading.Lock()
+        self.active_ai = None
+        # Serialized responses by format, each tagged with the state version it
+        # was rendered from, so polling an unchanged game costs a tuple compare.
+        self.rendered = {}
+        # WebSocket subscribers, and the last state they were sent so each
+        # change goes out as a diff against it.
+        self.events = EventBroker()
+        self.published = None
+        self.published_version = None
+        self.ply = 0
+
+    def init_game(self, mode: str = "ai", ai_depth_white: int = 2, ai_depth_black: int = 2, time_ms: int = 5000,
+                  fmt: str = FULL_FORMAT) -> bytes:
+        self.cancel_ai_move()
+        with self.lock:
+            self._configure(mode, ai_depth_white, ai_depth_black, time_ms)
+            self.game_state = GameState()
+            self.ply = 0
+            if self.journal:
+                self.journal.submit("game", self.game_id, self._settings(), self.game_state.to_fen())
+            return self._render(fmt)
 
-    def init_game(self, mode: str = "ai", ai_depth_white: int = 2, ai_depth_black: int = 2) -> GameStateSchema:
+    def restore(self, saved: SavedGame):
+        # Rebuilds a stored game: the latest snapshot plus the moves logged after it.
+        settings = saved.settings
+        game_state = GameState.from_fen(saved.fen)
+        game_state.moved = saved.moved
+        if saved.last:
+            game_state.last_move = (SQUARE_COORDS[saved.last[0]], SQUARE_COORDS[saved.last[1]])
+        # The moves that led to the snapshot since its last capture or pawn
+        # move are plain piece moves, so playing them backwards rebuilds the
+        # positions the repetition rule compares against.
+        board, turn = [list(row) for row in game_state.board], game_state.turn
+        history = [game_state.hash]
+        for _, from_sq, to_sq in reversed([move for move in saved.moves if move[0] <= saved.ply]):
+            (start_row, start_col), (end_row, end_col) = SQUARE_COORDS[from_sq], SQUARE_COORDS[to_sq]
+            board[start_row][start_col], board[end_row][end_col] = board[end_row][end_col], None
+            turn = 'white' if turn == 'black' else 'black'
+            history.append(hash_position(board, turn))
+        game_state.restore_history(reversed(history), saved.clock)
+        ply = saved.ply
+        for ply, from_sq, to_sq in saved.moves:
+            if ply <= saved.ply:
+                continue
+            (start_row, start_col), (end_row, end_col) = SQUARE_COORDS[from_sq], SQUARE_COORDS[to_sq]
+            game_state.move_piece(start_row, start_col, end_row, end_col)
+        with self.lock:
+            self._configure(settings["mode"], settings["ai_depth_white"], settings["ai_depth_black"],
+                            settings["time_ms"])
+            self.game_state = game_state
+            self.ply = ply
+
+    def _configure(self, mode: str, ai_depth_white: int, ai_depth_black: int, time_ms: int):
         self.mode = mode
         self.ai_depth_white = ai_depth_white
         self.ai_depth_black = ai_depth_black
+        self.time_ms = time_ms
 
         if mode == "ai":
             self.chess_ai_white = None
-            self.chess_ai_black = ChessAI(depth=ai_depth_black)
+            self.chess_ai_black = self._new_ai(ai_depth_black)
         elif mode == "ai_vs_ai":
-            self.chess_ai_white = ChessAI(depth=ai_depth_white)
-            self.chess_ai_black = ChessAI(depth=ai_depth_black)
+            self.chess_ai_white = self._new_ai(ai_depth_white)
+            self.chess_ai_black = self._new_ai(ai_depth_black)
         else:  # human mode
             self.chess_ai_white = None
             self.chess_ai_black = None
 
-        self.game_state = GameState()
-        return GameStateSchema.from_orm(self.game_state)
+    def _settings(self) -> dict:
+        return {"mode": self.mode, "ai_depth_white": self.ai_depth_white, "ai_depth_black": self.ai_depth_black,
+                "time_ms": self.time_ms}
 
-    def select_piece(self, row: int, col: int) -> GameStateSchema:
-        success = self.game_state.select_piece(row, col)
-        if not success:
-            self.game_state.message = "Invalid piece selection"
-        return GameStateSchema.from_orm(self.game_state)
+    def _play(self, start_row: int, start_col: int, end_row: int, end_col: int):
+        # Called with the lock held. Journal writes are queued, never waited on.
+        self.game_state.move_piece(start_row, start_col, end_row, end_col)
+        self.ply += 1
+        if not self.journal:
+            return
+        self.journal.submit("move", self.game_id, self.ply, square(start_row, start_col), square(end_row, end_col))
+        if self.ply % SNAPSHOT_INTERVAL == 0:
+            state = self.game_state
+            self.journal.submit("snapshot", self.game_id, self.ply, state.to_fen(), state.moved,
+                                [square(*state.last_move[0]), square(*state.last_move[1])], state.halfmove_clock)
 
-    def make_move(self, start_row: int, start_col: int, end_row: int, end_col: int) -> GameStateSchema:
-        if self.game_state.ai_thinking or self.game_state.game_over:
-            self.game_state.message = "Invalid move: Game is processing or over"
-            return GameStateSchema.from_orm(self.game_state)
+    def _new_ai(self, depth: int) -> ChessAI:
+        return ChessAI(depth=depth, time_ms=self.time_ms, tt_size_mb=self.tt_size_mb, pool=self.search_pool,
+                       transposition_table=self.transposition_table, book=self.book, tablebase=self.tablebase,
+                       on_iteration=self._publish_info, shared_cache=self.shared_cache)
 
-        if self.game_state.selected_piece != (start_row, start_col):
-            self.game_state.message = "Piece not selected"
-            return GameStateSchema.from_orm(self.game_state)
+    def memory_estimate_mb(self) -> float:
+        if self.transposition_table:
+            return 0
+        return sum(ai.transposition_table.size_mb for ai in (self.chess_ai_white, self.chess_ai_black) if ai)
 
-        if (end_row, end_col) not in self.game_state.valid_moves:
-            self.game_state.message = "Invalid move"
-            return GameStateSchema.from_orm(self.game_state)
+    def select_piece(self, row: int, col: int, fmt: str = FULL_FORMAT) -> bytes:
+        with self.lock:
+            success = self.game_state.select_piece(row, col)
+            if not success:
+                self.game_state.message = "Invalid piece selection"
+            return self._render(fmt)
 
-        piece = self.game_state.board[start_row][start_col]
-        if not piece or piece.team != self.game_state.turn:
-            self.game_state.message = "Invalid move: Not your turn"
-            return GameStateSchema.from_orm(self.game_state)
+    def make_move(self, start_row: int, start_col: int, end_row: int, end_col: int,
+                  fmt: str = FULL_FORMAT) -> bytes:
+        with self.lock:
+            if self.game_state.ai_thinking or self.game_state.game_over:
+                self.game_state.message = "Invalid move: Game is processing or over"
+                return self._render(fmt)
 
-        self.game_state.move_piece(start_row, start_col, end_row, end_col)
-        return GameStateSchema.from_orm(self.game_state)
-
-    def make_ai_move(self) -> GameStateSchema:
-        if self.game_state.ai_thinking or self.game_state.game_over:
-            self.game_state.message = "Invalid AI move request"
-            return GameStateSchema.from_orm(self.game_state)
-
-        if self.mode == "ai" and self.game_state.turn == 'black' and self.chess_ai_black:
-            best_move = self.chess_ai_black.make_move(self.game_state, 'black')
-            response = GameStateSchema.from_orm(self.game_state)
-            response.nodes_evaluated = self.chess_ai_black.nodes_evaluated
-            return response
+            if self.game_state.selected_piece != (start_row, start_col):
+                self.game_state.message = "Piece not selected"
+                return self._render(fmt)
+
+            if (end_row, end_col) not in self.game_state.valid_moves:
+                self.game_state.message = "Invalid move"
+                return self._render(fmt)
+
+            piece = self.game_state.board[start_row][start_col]
+            if not piece or piece.team != self.game_state.turn:
+                self.game_state.message = "Invalid move: Not your turn"
+                return self._render(fmt)
+
+            self._play(start_row, start_col, end_row, end_col)
+            return self._render(fmt)
+
+    def make_ai_move(self, fmt: str = FULL_FORMAT) -> bytes:
+        with self.lock:
+            chess_ai = self._ai_to_move()
+            if self.game_state.ai_thinking or self.game_state.game_over or not chess_ai:
+                self.game_state.message = "Invalid AI move request"
+                return self._render(fmt)
+            game_state = self.game_state
+            game_state.ai_thinking = True
+            chess_ai.cancelled = False
+            self.active_ai = chess_ai
+            # Search a private copy so concurrent readers never see the
+            # search's make/unmake churn on the live board.
+            search_state = game_state.copy()
+            self._publish_state()
+
+        try:
+            best_move = chess_ai.search(search_state, search_state.turn)
+            metrics.record_search(chess_ai.stats)
+        finally:
+            with self.lock:
+                self.active_ai = None
+                game_state.ai_thinking = False
+
+        with self.lock:
+            if chess_ai.cancelled or self.game_state is not game_state:
+                return self._render(fmt)
+            if best_move:
+                start, end = best_move
+                self._play(start[0], start[1], end[0], end[1])
+                self._publish_move(chess_ai, best_move)
+            return self._ai_response(chess_ai, fmt)
+
+    def cancel_ai_move(self):
+        with self.lock:
+            if self.active_ai:
+                self.active_ai.cancel()
+
+    def _ai_to_move(self):
+        if self.mode == "ai" and self.game_state.turn == 'black':
+            return self.chess_ai_black
         elif self.mode == "ai_vs_ai":
-            if self.game_state.turn == 'white' and self.chess_ai_white:
-                best_move = self.chess_ai_white.make_move(self.game_state, 'white')
-                response = GameStateSchema.from_orm(self.game_state)
-                response.nodes_evaluated = self.chess_ai_white.nodes_evaluated
-                return response
-            elif self.game_state.turn == 'black' and self.chess_ai_black:
-                best_move = self.chess_ai_black.make_move(self.game_state, 'black')
-                response = GameStateSchema.from_orm(self.game_state)
-                response.nodes_evaluated = self.chess_ai_black.nodes_evaluated
-                return response
-        self.game_state.message = "Invalid AI move request"
-        return GameStateSchema.from_orm(self.game_state)
-
-    def get_game_state(self) -> GameStateSchema:
-        return GameStateSchema.from_orm(self.game_state)
\ No newline at end of file
+            return self.chess_ai_white if self.game_state.turn == 'white' else self.chess_ai_black
+        return None
+
+    def _state_response(self) -> GameStateSchema:
+        response = GameStateSchema.from_orm(self.game_state)
+        response.game_id = self.game_id
+        return response
+
+    def _version(self) -> tuple:
+        # Everything a response shows follows from these fields.
+        state = self.game_state
+        return (id(state), state.hash, len(state.undo_stack), state.selected_piece, state.message,
+                state.ai_thinking, state.game_over)
+
+    def subscribe(self):
+        # Returns the subscriber's queue and a full snapshot to send first;
+        # every later event is a diff against that snapshot.
+        with self.lock:
+            self._publish_state()
+            self.published = compact_state(self.game_state, self.game_id)
+            self.published_version = self._version()
+            queue = self.events.subscribe()
+            return queue, self._event("state", self.published)
+
+    def unsubscribe(self, queue):
+        self.events.unsubscribe(queue)
+
+    def _event(self, kind: str, fields: dict) -> str:
+        return json.dumps({"type": kind, **fields}, separators=(",", ":"))
+
+    def _publish_state(self):
+        # Called with the lock held on every response path, so subscribers see
+        # each change no matter which client made it.
+        if not self.events:
+            return
+        version = self._version()
+        if version == self.published_version:
+            return
+        current = compact_state(self.game_state, self.game_id)
+        diff = state_diff(self.published, current)
+        self.published, self.published_version = current, version
+        if diff:
+            self.events.publish(self._event("diff", diff))
+
+    def _publish_info(self, info: dict):
+        # Runs on the search thread after each iteration of the deepening loop.
+        if self.events:
+            self.events.publish(self._event("info", dict(info, pv=[compact_move(move) for move in info["pv"]])))
+
+    def _publish_move(self, chess_ai: ChessAI, move):
+        if not self.events:
+            return
+        score, mate = score_fields(chess_ai.score)
+        self.events.publish(self._event("move", {"move": compact_move(move), "score": score, "mate": mate,
+                                                 "depth": chess_ai.stats.depth, "nodes": chess_ai.nodes,
+                                                 "time_ms": chess_ai.stats.time_ms}))
+
+    def _render(self, fmt: str) -> bytes:
+        self._publish_state()
+        version = self._version()
+        cached = self.rendered.get(fmt)
+        if cached and cached[0] == version:
+            return cached[1]
+        if fmt == COMPACT_FORMAT:
+            body = json.dumps(compact_state(self.game_state, self.game_id), separators=(",", ":")).encode()
+        else:
+            body = self._state_response().model_dump_json().encode()
+        self.rendered[fmt] = (version, body)
+        return body
+
+    def _ai_response(self, chess_ai: ChessAI, fmt: str) -> bytes:
+        self._publish_state()
+        stats = chess_ai.stats.as_dict()
+        if fmt == COMPACT_FORMAT:
+            response = compact_state(self.game_state, self.game_id)
+            response.update(nodes=chess_ai.nodes_evaluated, nps=chess_ai.nodes_per_second, stats=stats)
+            return json.dumps(response, separators=(",", ":")).encode()
+        response = self._state_response()
+        response.nodes_evaluated = chess_ai.nodes_evaluated
+        response.nodes_per_second = chess_ai.nodes_per_second
+        response.workers = chess_ai.workers
+        response.search_stats = SearchStatsSchema(**stats)
+        return response.model_dump_json().encode()
+
+    def get_game_state(self, fmt: str = FULL_FORMAT) -> bytes:
+        # The lock keeps a poll from rendering, caching or publishing a move
+        # that the AI thread is halfway through applying.
+        with self.lock:
+            return self._render(fmt)
\ No newline at end of file
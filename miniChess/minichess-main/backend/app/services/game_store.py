@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import struct
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Move log record: ply of the move (1 for the first), from square and to square.
+MOVE_RECORD = struct.Struct("<IBB")
+SAFE_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+class SavedGame(NamedTuple):
+    settings: dict
+    # Snapshot: position after `ply` moves, its has_moved mask, last move and
+    # plies since the last capture or pawn move.
+    ply: int
+    fen: str
+    moved: int
+    last: Optional[Tuple[int, int]]
+    clock: int
+    # (ply, from_sq, to_sq) for every logged move after ply - clock: the
+    # reversible moves that led to the snapshot, then the ones after it.
+    moves: List[Tuple[int, int, int]]
+
+class GameStore:
+    # Backends receive batches of events from StoreWriter's thread, in order:
+    #   ("game", game_id, settings, fen)  a new game, replacing any old one
+    #   ("move", game_id, ply, from_sq, to_sq)
+    #   ("snapshot", game_id, ply, fen, moved, last, clock)
+    def write(self, events: list):
+        raise NotImplementedError
+
+    def load(self, game_id: str) -> Optional[SavedGame]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class FileGameStore(GameStore):
+    # Per game: <name>.json holds the settings and latest snapshot and is
+    # replaced atomically; <name>.log is the append-only binary move log.
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, game_id: str, suffix: str) -> str:
+        # Client-chosen ids never become paths unless they are plainly safe.
+        name = game_id if SAFE_NAME.fullmatch(game_id) else hashlib.sha256(game_id.encode()).hexdigest()
+        return os.path.join(self.directory, name + suffix)
+
+    def _write_meta(self, game_id: str, meta: dict):
+        path = self._path(game_id, ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def _read_meta(self, game_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(game_id, ".json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write(self, events: list):
+        logs = {}
+        metas = {}
+        for event in events:
+            kind, game_id = event[0], event[1]
+            if kind == "game":
+                _, _, settings, fen = event
+                logs.pop(game_id, None)
+                with open(self._path(game_id, ".log"), "wb"):
+                    pass
+                metas[game_id] = {"game_id": game_id, "settings": settings, "ply": 0, "fen": fen, "moved": 0,
+                                  "last": None, "clock": 0}
+                self._write_meta(game_id, metas[game_id])
+            elif kind == "move":
+                _, _, ply, from_sq, to_sq = event
+                logs.setdefault(game_id, bytearray()).extend(MOVE_RECORD.pack(ply, from_sq, to_sq))
+            elif kind == "snapshot":
+                _, _, ply, fen, moved, last, clock = event
+                meta = metas.get(game_id) or self._read_meta(game_id)
+                if meta is None:
+                    continue
+                meta.update(ply=ply, fen=fen, moved=moved, last=last, clock=clock)
+                metas[game_id] = meta
+        # Moves are appended before the snapshots that cover them are
+        # published, so a reader never sees a snapshot ahead of its log.
+        for game_id, records in logs.items():
+            with open(self._path(game_id, ".log"), "ab") as f:
+                f.write(records)
+        for game_id, meta in metas.items():
+            self._write_meta(game_id, meta)
+
+    def load(self, game_id: str) -> Optional[SavedGame]:
+        meta = self._read_meta(game_id)
+        if meta is None or meta.get("game_id") != game_id:
+            return None
+        try:
+            with open(self._path(game_id, ".log"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        # A torn record at the end of the log is ignored.
+        usable = len(data) - len(data) % MOVE_RECORD.size
+        clock = meta.get("clock", 0)
+        moves = [move for move in MOVE_RECORD.iter_unpack(data[:usable]) if move[0] > meta["ply"] - clock]
+        last = tuple(meta["last"]) if meta["last"] else None
+        return SavedGame(meta["settings"], meta["ply"], meta["fen"], meta["moved"], last, clock, moves)
+
+class SqliteGameStore(GameStore):
+    def __init__(self, path: str):
+        self.path = path
+        # Writes come from the writer thread and loads from request threads.
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS games (game_id TEXT PRIMARY KEY, settings TEXT, "
+                                    "ply INTEGER, fen TEXT, moved INTEGER, last TEXT, clock INTEGER DEFAULT 0)")
+            # Stores written before the halfmove clock was kept lack its column.
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(games)")]
+            if "clock" not in columns:
+                self.connection.execute("ALTER TABLE games ADD COLUMN clock INTEGER DEFAULT 0")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS moves (game_id TEXT, ply INTEGER, from_sq INTEGER, "
+                                    "to_sq INTEGER, PRIMARY KEY (game_id, ply))")
+
+    def write(self, events: list):
+        # One transaction per batch.
+        with self.lock, self.connection:
+            for event in events:
+                kind, game_id = event[0], event[1]
+                if kind == "game":
+                    _, _, settings, fen = event
+                    self.connection.execute("DELETE FROM moves WHERE game_id = ?", (game_id,))
+                    self.connection.execute("INSERT OR REPLACE INTO games VALUES (?, ?, 0, ?, 0, NULL, 0)",
+                                            (game_id, json.dumps(settings), fen))
+                elif kind == "move":
+                    _, _, ply, from_sq, to_sq = event
+                    self.connection.execute("INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?)",
+                                            (game_id, ply, from_sq, to_sq))
+                elif kind == "snapshot":
+                    _, _, ply, fen, moved, last, clock = event
+                    self.connection.execute("UPDATE games SET ply = ?, fen = ?, moved = ?, last = ?, clock = ? "
+                                            "WHERE game_id = ?", (ply, fen, moved, json.dumps(last), clock, game_id))
+
+    def load(self, game_id: str) -> Optional[SavedGame]:
+        with self.lock:
+            row = self.connection.execute("SELECT settings, ply, fen, moved, last, clock FROM games WHERE game_id = ?",
+                                          (game_id,)).fetchone()
+            if row is None:
+                return None
+            settings, ply, fen, moved, last, clock = row
+            clock = clock or 0
+            moves = self.connection.execute("SELECT ply, from_sq, to_sq FROM moves WHERE game_id = ? AND ply > ? "
+                                            "ORDER BY ply", (game_id, ply - clock)).fetchall()
+        last = json.loads(last) if last else None
+        return SavedGame(json.loads(settings), ply, fen, moved, tuple(last) if last else None, clock, moves)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def open_store(url: Optional[str]) -> Optional[GameStore]:
+    # "file:<directory>" or "sqlite:<path>"; empty disables persistence.
+    if not url:
+        return None
+    backend, _, location = url.partition(":")
+    if backend == "file" and location:
+        return FileGameStore(location)
+    if backend == "sqlite" and location:
+        return SqliteGameStore(location)
+    raise ValueError(f"Unknown game store {url!r}, expected file:<directory> or sqlite:<path>")
+
+class StoreWriter:
+    # Requests only put events on a queue; one background thread drains it in
+    # batches, so disk I/O never sits in a request's latency path.
+    def __init__(self, store: GameStore, max_batch: int = 1024):
+        self.store = store
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        # Queued but unwritten events per game, so a reader can wait for one
+        # game's events without draining the whole queue.
+        self.pending = {}
+        self.written = threading.Condition()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="game-store", daemon=True)
+                self.thread.start()
+
+    def submit(self, *event):
+        if self.thread is None:
+            self.start()
+        with self.written:
+            self.pending[event[1]] = self.pending.get(event[1], 0) + 1
+        self.queue.put(event)
+
+    def wait_for(self, game_id: str):
+        # Blocks until every event submitted so far for game_id is written.
+        with self.written:
+            self.written.wait_for(lambda: game_id not in self.pending)
+
+    def flush(self):
+        # Blocks until everything submitted so far is written.
+        self.queue.join()
+
+    def close(self):
+        with self.lock:
+            if self.thread is not None:
+                self.queue.put(None)
+                self.thread.join()
+                self.thread = None
+        self.store.close()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            events = [event for event in batch if event is not None]
+            try:
+                if events:
+                    self.store.write(events)
+            except Exception:
+                logger.exception("Failed to write %d game store events", len(events))
+            finally:
+                with self.written:
+                    for event in events:
+                        remaining = self.pending[event[1]] - 1
+                        if remaining:
+                            self.pending[event[1]] = remaining
+                        else:
+                            del self.pending[event[1]]
+                    self.written.notify_all()
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEPTH_BUCKETS = tuple(range(1, 11))
+INF_BUCKET = 'le="+Inf"'
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = labels
+        self.values: Dict[Tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = labels
+        self.series: Dict[Tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # Per-bucket counts, then sum and count.
+                series = self.series[labels] = [[0] * len(self.buckets), 0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, INF_BUCKET)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class Metrics:
+    def __init__(self):
+        self.request_latency = Histogram("minichess_request_duration_seconds", "HTTP request latency by route.",
+                                         LATENCY_BUCKETS, ("method", "route", "status"))
+        self.searches = Counter("minichess_searches_total", "AI searches run.")
+        self.search_duration = Histogram("minichess_search_duration_seconds", "Wall time of AI searches.",
+                                         LATENCY_BUCKETS)
+        self.search_depth = Histogram("minichess_search_depth", "Deepest completed iteration per search.",
+                                      DEPTH_BUCKETS)
+        self.search_nodes = Counter("minichess_search_nodes_total", "Nodes visited by AI searches.")
+        self.quiescence_nodes = Counter("minichess_search_quiescence_nodes_total", "Quiescence nodes visited.")
+        self.tt_probes = Counter("minichess_tt_probes_total", "Transposition table probes.")
+        self.tt_hits = Counter("minichess_tt_hits_total", "Transposition table probes that found an entry.")
+        self.tt_cutoffs = Counter("minichess_tt_cutoffs_total", "Nodes answered from the transposition table.")
+        self.beta_cutoffs = Counter("minichess_beta_cutoffs_total", "Alpha-beta cutoffs.")
+        self.first_move_cutoffs = Counter("minichess_first_move_cutoffs_total",
+                                          "Alpha-beta cutoffs produced by the first move searched.")
+        self.book_hits = Counter("minichess_book_hits_total", "AI moves answered from the opening book.")
+        self.tb_hits = Counter("minichess_tablebase_hits_total", "Search nodes and moves resolved by the tablebase.")
+        self.shared_hits = Counter("minichess_shared_cache_hits_total",
+                                   "Transposition table misses answered by the shared search cache.")
+        self.repetitions = Counter("minichess_search_repetitions_total",
+                                   "Search nodes scored as draws because the position repeated.")
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        self.request_latency.observe(seconds, method, route, str(status))
+
+    def record_search(self, stats):
+        self.searches.inc()
+        self.search_duration.observe(stats.time_ms / 1000)
+        self.search_depth.observe(stats.depth)
+        self.search_nodes.inc(stats.nodes)
+        self.quiescence_nodes.inc(stats.quiescence_nodes)
+        self.tt_probes.inc(stats.tt_probes)
+        self.tt_hits.inc(stats.tt_hits)
+        self.tt_cutoffs.inc(stats.tt_cutoffs)
+        self.beta_cutoffs.inc(stats.beta_cutoffs)
+        self.first_move_cutoffs.inc(stats.first_move_cutoffs)
+        self.book_hits.inc(stats.book_hits)
+        self.tb_hits.inc(stats.tb_hits)
+        self.shared_hits.inc(stats.shared_hits)
+        self.repetitions.inc(stats.repetitions)
+
+    def render(self) -> str:
+        lines = []
+        for metric in vars(self).values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class SearchQueueFull(Exception):
+    pass
+
+class SearchExecutor:
+    def __init__(self, max_workers: int = 4, max_pending: int = 16, poll_interval: float = 0.1):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise SearchQueueFull()
+            self.pending += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _):
+        with self.lock:
+            self.pending -= 1
+
+    async def run(self, request, fn, *args, on_disconnect=None):
+        future = self.submit(fn, *args)
+        waiter = asyncio.wrap_future(future)
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=self.poll_interval)
+            if done:
+                return waiter.result()
+            if await request.is_disconnected():
+                # A queued search is simply dropped; a running one is told to
+                # abort at its next node check.
+                if not future.cancel() and on_disconnect:
+                    on_disconnect()
+                return None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
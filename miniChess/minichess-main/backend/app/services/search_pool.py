@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from ..models.game_state import GameState
+from ..models.time_manager import install_stop_flags
+
+# Parallel searches that can be cancelled at once; any beyond this run their
+# workers to the time limit.
+STOP_SLOTS = 64
+
+def _warm_up(_):
+    # Build the move tables and a first position so the first real search in
+    # this worker does not pay for imports.
+    return len(GameState().get_all_possible_moves('white'))
+
+class SearchPool:
+    def __init__(self, workers: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.stop_flags = None
+        self.free_slots = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.executor is None:
+            self.stop_flags = multiprocessing.RawArray('b', STOP_SLOTS)
+            self.free_slots = list(range(STOP_SLOTS))
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=install_stop_flags,
+                                                initargs=(self.stop_flags,))
+            list(self.executor.map(_warm_up, range(self.workers)))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def submit(self, fn, *args):
+        if self.executor is None:
+            self.start()
+        return self.executor.submit(fn, *args)
+
+    def acquire_stop_slot(self):
+        if self.executor is None:
+            self.start()
+        with self.lock:
+            return self.free_slots.pop() if self.free_slots else None
+
+    def stop(self, slot, futures):
+        # Queued work is dropped; running workers stop at their next check.
+        for future in futures:
+            future.cancel()
+        if slot is not None:
+            self.stop_flags[slot] = 1
+
+    def release_stop_slot(self, slot, futures):
+        # The slot is reused only once every worker given it has finished, so
+        # a stopped search cannot stop the next one.
+        if slot is None:
+            return
+        flags = self.stop_flags
+        remaining = [len(futures)]
+
+        def finished(_=None):
+            with self.lock:
+                remaining[0] -= 1
+                if remaining[0] <= 0 and flags is self.stop_flags:
+                    flags[slot] = 0
+                    self.free_slots.append(slot)
+
+        if not futures:
+            finished()
+        for future in futures:
+            future.add_done_callback(finished)
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from ..models.transposition import TranspositionTable
+from ..models.opening_book import OpeningBook
+from ..models.tablebase import Tablebase
+from ..models.shared_cache import SharedCache
+from .game_service import GameService
+from .game_store import GameStore, StoreWriter
+from .search_pool import SearchPool
+
+# Measured with tracemalloc: board, caches and rendered responses of a new
+# game, plus the undo record and history entry each played move keeps.
+SESSION_OVERHEAD_MB = 0.01
+PLY_OVERHEAD_MB = 0.0007
+# Sizing: each AI engine of a session owns a table of tt_size_mb (one for
+# "ai" games, two for "ai_vs_ai") unless shared_tt_mb puts every session on
+# one shared table. The defaults keep an AI game near 0.26-0.51 MB, so the
+# 1024 MB cap holds 2000-4000 AI games and many more human ones, with
+# max_sessions as the count limit. The web searches are a few thousand
+# nodes deep, which a quarter-megabyte table (about 1600 entries) covers.
+DEFAULT_TT_MB = 0.25
+# Ids the store was asked for and did not have are remembered this long, so
+# repeated requests for an unknown game do not reach the disk every time.
+# It is kept short because another server process may create the game.
+MISSING_TTL = 30
+MAX_MISSING = 10000
+
+class SessionNotFound(Exception):
+    pass
+
+class SessionManager:
+    def __init__(self, max_sessions: int = 5000, idle_timeout: float = 1800, max_memory_mb: float = 1024,
+                 tt_size_mb: float = DEFAULT_TT_MB, shared_tt_mb: float = 0, parallel: bool = False, workers: int = None,
+                 book_path: str = None, tablebase_path: str = None, store: GameStore = None,
+                 shared_cache_path: str = None, shared_cache_mb: int = 64, shared_cache_warm: str = None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_memory_mb = max_memory_mb
+        self.tt_size_mb = tt_size_mb
+        self.shared_table = TranspositionTable(shared_tt_mb) if shared_tt_mb else None
+        self.search_pool = SearchPool(workers) if parallel else None
+        # One read-only mapping of the book and tablebases serves every session in the process.
+        self.book = OpeningBook.load(book_path)
+        self.tablebase = Tablebase.load(tablebase_path)
+        # Deep search results kept in a file every worker process maps, so a
+        # restarted or freshly scaled worker starts with a warm table.
+        self.shared_cache = SharedCache.load(shared_cache_path, shared_cache_mb, shared_cache_warm)
+        # Games are journaled to the store in the background and rebuilt from
+        # it on first access after a restart.
+        self.store = store
+        self.journal = StoreWriter(store) if store else None
+        self.sessions = OrderedDict()
+        self.last_access = {}
+        self.missing = OrderedDict()
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.search_pool:
+            self.search_pool.start()
+        if self.journal:
+            self.journal.start()
+
+    def shutdown(self):
+        for service in list(self.sessions.values()):
+            service.cancel_ai_move()
+        if self.search_pool:
+            self.search_pool.shutdown()
+        if self.journal:
+            self.journal.close()
+
+    def create(self, game_id: str = None) -> GameService:
+        with self.lock:
+            game_id = game_id or uuid.uuid4().hex
+            service = self.sessions.get(game_id)
+            if service is None:
+                service = self._new_service(game_id)
+                self.sessions[game_id] = service
+                self.missing.pop(game_id, None)
+            self._touch(game_id)
+            return service
+
+    def get(self, game_id: str) -> GameService:
+        # Blocks on the store for a game that is not in memory; request
+        # handlers use get_async instead.
+        service = self._lookup(game_id)
+        if service is None:
+            service = self._resume(game_id)
+        if service is None:
+            raise SessionNotFound(game_id)
+        return service
+
+    async def get_async(self, game_id: str) -> GameService:
+        # Store reads run on the default executor, so resuming one game never
+        # holds up the event loop or requests for other sessions.
+        service = self._lookup(game_id)
+        if service is None and self.store:
+            service = await asyncio.get_running_loop().run_in_executor(None, self._resume, game_id)
+        if service is None:
+            raise SessionNotFound(game_id)
+        return service
+
+    def _lookup(self, game_id: str):
+        with self.lock:
+            self._evict_idle()
+            service = self.sessions.get(game_id)
+            if service is not None:
+                self._touch(game_id)
+            return service
+
+    def _new_service(self, game_id: str) -> GameService:
+        return GameService(game_id=game_id, search_pool=self.search_pool, tt_size_mb=self.tt_size_mb,
+                           transposition_table=self.shared_table, book=self.book, tablebase=self.tablebase,
+                           journal=self.journal, shared_cache=self.shared_cache)
+
+    def _resume(self, game_id: str):
+        # Runs without the manager lock held; only the bookkeeping takes it.
+        if not self.store:
+            return None
+        with self.lock:
+            expires = self.missing.get(game_id)
+            if expires is not None:
+                if expires > time.monotonic():
+                    return None
+                del self.missing[game_id]
+        # An evicted game may still have events queued; let those land first.
+        self.journal.wait_for(game_id)
+        saved = self.store.load(game_id)
+        service = None
+        if saved is not None:
+            service = self._new_service(game_id)
+            service.restore(saved)
+        with self.lock:
+            # Another request may have created or resumed the game meanwhile.
+            existing = self.sessions.get(game_id)
+            if existing is not None:
+                self._touch(game_id)
+                return existing
+            if service is None:
+                self.missing[game_id] = time.monotonic() + MISSING_TTL
+                if len(self.missing) > MAX_MISSING:
+                    self.missing.popitem(last=False)
+                return None
+            self.sessions[game_id] = service
+            self._touch(game_id)
+            return service
+
+    def enforce_limits(self):
+        with self.lock:
+            self._evict_idle()
+            # Least recently used sessions go first; a session with a search in
+            # flight is skipped so its worker is not left writing to a dead game.
+            for game_id in list(self.sessions)[:-1]:
+                if len(self.sessions) <= self.max_sessions and self.memory_usage_mb() <= self.max_memory_mb:
+                    break
+                if not self.sessions[game_id].game_state.ai_thinking:
+                    self._remove(game_id)
+
+    def memory_usage_mb(self) -> float:
+        shared = self.shared_table.size_mb if self.shared_table else 0
+        return shared + sum(SESSION_OVERHEAD_MB + PLY_OVERHEAD_MB * len(service.game_state.undo_stack)
+                            + service.memory_estimate_mb() for service in self.sessions.values())
+
+    def _touch(self, game_id: str):
+        self.sessions.move_to_end(game_id)
+        self.last_access[game_id] = time.monotonic()
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for game_id in list(self.sessions):
+            if self.last_access[game_id] > cutoff:
+                break
+            if not self.sessions[game_id].game_state.ai_thinking:
+                self._remove(game_id)
+
+    def _remove(self, game_id: str):
+        del self.sessions[game_id]
+        del self.last_access[game_id]
@@ -0,0 +1,266 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from .constants import ROWS
+from .models.chess_ai import ChessAI, EVAL_MODES
+from .models.game_state import GameState
+from .models.opening_book import OpeningBook
+from .models.tablebase import Tablebase
+
+# Engine options accepted in an --engine spec, with the type each is read as.
+ENGINE_OPTIONS = {'depth': int, 'time_ms': int, 'tt_mb': int, 'eval': str, 'book': str, 'tablebase': str}
+ENGINE_DEFAULTS = {'depth': 3, 'time_ms': 1000, 'tt_mb': 4, 'eval': 'incremental', 'book': '', 'tablebase': ''}
+RESULTS = {1.0: '1-0', 0.5: '1/2-1/2', 0.0: '0-1'}
+
+
+def parse_engine(spec, default_name):
+    # "name:depth=4,time_ms=200,eval=full"; the name and every option are optional.
+    name, _, options = spec.partition(':')
+    if '=' in name or not _:
+        name, options = '', spec
+    config = dict(ENGINE_DEFAULTS, name=name or default_name)
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key not in ENGINE_OPTIONS or not value:
+            raise ValueError(f"Unknown engine option {option!r}, expected one of {', '.join(ENGINE_OPTIONS)}")
+        config[key] = ENGINE_OPTIONS[key](value)
+    if config['eval'] not in EVAL_MODES:
+        raise ValueError(f"Unknown evaluation mode: {config['eval']}")
+    return config
+
+
+def square_name(row, col):
+    return f"{'abcde'[col]}{ROWS - row}"
+
+
+def move_name(move):
+    (sr, sc), (er, ec) = move
+    return square_name(sr, sc) + square_name(er, ec)
+
+
+def random_opening(rng, plies):
+    # Random legal moves from the start; lines that end the game are redrawn.
+    while True:
+        game_state = GameState()
+        moves = []
+        for _ in range(plies):
+            legal = game_state.get_all_possible_moves(game_state.turn)
+            if not legal:
+                break
+            start, end = rng.choice(legal)
+            game_state.make_move(start[0], start[1], end[0], end[1])
+            moves.append((start, end))
+        if not game_state.game_over:
+            return moves
+
+
+_resources = {}
+
+
+def _resource(loader, path):
+    # Books and tablebases are mapped once per worker process and shared by
+    # every engine in it.
+    if (loader, path) not in _resources:
+        _resources[loader, path] = loader(path) if path else None
+    return _resources[loader, path]
+
+
+def _engine(config):
+    # A fresh engine per game, so no game is searched with a table warmed by
+    # the one before it.
+    return ChessAI(depth=config['depth'], time_ms=config['time_ms'], tt_size_mb=config['tt_mb'],
+                   eval_mode=config['eval'], book=_resource(OpeningBook.load, config['book']),
+                   tablebase=_resource(Tablebase.load, config['tablebase']))
+
+
+def play_game(white, black, opening, max_plies):
+    # Runs inside a tournament worker. Returns white's score, how the game
+    # ended and every move played, opening included.
+    game_state = GameState()
+    engines = {'white': _engine(white), 'black': _engine(black)}
+    moves = []
+    for start, end in opening:
+        game_state.move_piece(start[0], start[1], end[0], end[1])
+        moves.append((start, end))
+    while not game_state.game_over:
+        if len(moves) >= max_plies:
+            return 0.5, f"Adjudicated draw after {max_plies} plies", moves
+        move = engines[game_state.turn].search(game_state, game_state.turn)
+        if move is None:
+            break
+        start, end = move
+        game_state.move_piece(start[0], start[1], end[0], end[1])
+        moves.append(move)
+    if game_state.check[game_state.turn] and not game_state.draw:
+        return (0.0 if game_state.turn == 'white' else 1.0), game_state.message, moves
+    return 0.5, game_state.message, moves
+
+
+def sprt_bounds(alpha, beta):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    # Log-likelihood ratio of elo1 against elo0 for the candidate's results,
+    # with the score distribution approximated as normal (as fishtest's
+    # trinomial GSPRT does). Half a game is added to each outcome so a run
+    # that has not yet lost, won or drawn still has a usable variance.
+    wins, draws, losses = wins + 0.5, draws + 0.5, losses + 0.5
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance <= 0:
+        return 0.0
+    score0, score1 = expected_score(elo0), expected_score(elo1)
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(wins, draws, losses):
+    games = wins + draws + losses
+    if not games:
+        return 0.0
+    score = min(max((wins + draws / 2) / games, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def pgn(round_number, white, black, opening, result, termination, moves):
+    tags = [('Event', 'MiniChess tournament'), ('Round', str(round_number)), ('White', white['name']),
+            ('Black', black['name']), ('FEN', GameState().to_fen()), ('Opening', ' '.join(map(move_name, opening))),
+            ('Result', RESULTS[result]), ('Termination', termination), ('PlyCount', str(len(moves)))]
+    lines = [f'[{tag} "{value}"]' for tag, value in tags]
+    movetext = []
+    for ply, move in enumerate(moves):
+        if ply % 2 == 0:
+            movetext.append(f"{ply // 2 + 1}.")
+        movetext.append(move_name(move))
+    movetext.append(RESULTS[result])
+    return '\n'.join(lines) + '\n\n' + ' '.join(movetext) + '\n\n'
+
+
+def run(candidate, baseline, games=1000, workers=None, opening_plies=4, max_plies=200, seed=None, sprt=None,
+        output=None, log=None):
+    # Openings are played in pairs with colours swapped, so neither engine
+    # gains from a lopsided random line. Scores are the candidate's.
+    rng = random.Random(seed)
+    bounds = sprt_bounds(sprt['alpha'], sprt['beta']) if sprt else None
+    wins = draws = losses = 0
+    llr = 0.0
+    decision = None
+    started = time.monotonic()
+
+    def schedule():
+        for pair in range((games + 1) // 2):
+            opening = random_opening(rng, opening_plies)
+            yield 2 * pair + 1, candidate, baseline, opening
+            if 2 * pair + 2 <= games:
+                yield 2 * pair + 2, baseline, candidate, opening
+
+    workers = workers or os.cpu_count() or 1
+    tasks = schedule()
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        def submit():
+            # Only a couple of games per worker are queued, so an SPRT stop
+            # leaves nothing long-running behind.
+            while len(pending) < 2 * workers:
+                task = next(tasks, None)
+                if task is None:
+                    return
+                round_number, white, black, opening = task
+                future = executor.submit(play_game, white, black, opening, max_plies)
+                pending[future] = task
+
+        submit()
+        while pending and decision is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                round_number, white, black, opening = pending.pop(future)
+                result, termination, moves = future.result()
+                score = result if white is candidate else 1 - result
+                if score == 1:
+                    wins += 1
+                elif score == 0:
+                    losses += 1
+                else:
+                    draws += 1
+                if output:
+                    output.write(pgn(round_number, white, black, opening, result, termination, moves))
+                    output.flush()
+                if sprt:
+                    llr = sprt_llr(wins, draws, losses, sprt['elo0'], sprt['elo1'])
+                    if llr <= bounds[0]:
+                        decision = 'H0'
+                    elif llr >= bounds[1]:
+                        decision = 'H1'
+                if log:
+                    log(f"{wins + draws + losses:5d} games  +{wins} ={draws} -{losses}  "
+                        f"elo {elo_difference(wins, draws, losses):+7.1f}"
+                        + (f"  llr {llr:+.2f} [{bounds[0]:.2f}, {bounds[1]:.2f}]" if sprt else '')
+                        + f"  {time.monotonic() - started:7.1f}s")
+            if decision is None:
+                submit()
+        for future in pending:
+            future.cancel()
+    return {'wins': wins, 'draws': draws, 'losses': losses, 'elo': elo_difference(wins, draws, losses),
+            'llr': llr, 'decision': decision, 'seconds': time.monotonic() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.tournament',
+                                     description="Play a candidate engine against a baseline in self-play games")
+    parser.add_argument('--engine', action='append', default=[],
+                        help="engine spec [name:]option=value,... with options "
+                             f"{', '.join(ENGINE_OPTIONS)}; give it twice, candidate first")
+    parser.add_argument('--games', type=int, default=1000, help="games to play unless SPRT stops earlier")
+    parser.add_argument('--workers', type=int, help="worker processes, one per CPU by default")
+    parser.add_argument('--opening-plies', type=int, default=4, help="random plies played before the engines")
+    parser.add_argument('--max-plies', type=int, default=200, help="plies after which a game is drawn")
+    parser.add_argument('--seed', type=int, help="seed for the random openings")
+    parser.add_argument('--output', help="append games in PGN to this file")
+    parser.add_argument('--sprt', action='store_true', help="stop as soon as elo0 or elo1 is accepted")
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=10.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    specs = args.engine or ['candidate:', 'baseline:']
+    if len(specs) != 2:
+        parser.error("--engine must be given twice, candidate first")
+    try:
+        candidate, baseline = parse_engine(specs[0], 'candidate'), parse_engine(specs[1], 'baseline')
+    except ValueError as exc:
+        parser.error(str(exc))
+    sprt = {'elo0': args.elo0, 'elo1': args.elo1, 'alpha': args.alpha, 'beta': args.beta} if args.sprt else None
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr))
+
+    output = open(args.output, 'a') if args.output else None
+    try:
+        summary = run(candidate, baseline, args.games, args.workers, args.opening_plies, args.max_plies, args.seed,
+                      sprt, output, log)
+    finally:
+        if output:
+            output.close()
+    games = summary['wins'] + summary['draws'] + summary['losses']
+    print(f"{candidate['name']} vs {baseline['name']}: {games} games, +{summary['wins']} ={summary['draws']} "
+          f"-{summary['losses']}, elo {summary['elo']:+.1f} in {summary['seconds']:.1f}s")
+    if sprt:
+        verdict = {'H1': f"H1 accepted: {candidate['name']} is at least {args.elo1:+g} elo",
+                   'H0': f"H0 accepted: {candidate['name']} is not better than {args.elo0:+g} elo",
+                   None: "SPRT inconclusive"}[summary['decision']]
+        print(f"{verdict} (llr {summary['llr']:+.2f})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# Puts the backend directory on sys.path, so tests import the app package
+# wherever pytest is started from.
@@ -0,0 +1,41 @@
+import pytest
+from app.bench import POSITIONS, _generate_moves
+from app.models import evaluation
+from app.models.chess_ai import ChessAI
+from app.models.game_state import GameState
+
+pytest.importorskip('pytest_benchmark')
+
+BENCHMARKED = ('initial', 'midgame')
+SEARCH_DEPTH = 3
+
+
+@pytest.fixture(params=BENCHMARKED)
+def game_state(request):
+    return GameState.from_fen(POSITIONS[request.param][0])
+
+
+def test_move_generation(benchmark, game_state):
+    moves = benchmark(_generate_moves, game_state)
+    assert moves
+
+
+def test_evaluate_incremental(benchmark, game_state):
+    benchmark(evaluation.evaluate, game_state)
+
+
+def test_evaluate_full(benchmark, game_state):
+    benchmark(ChessAI().evaluate_board, game_state)
+
+
+def test_search_fixed_depth(benchmark, game_state):
+    # A fresh engine per round, so no round starts from a warm table.
+    def setup():
+        return (ChessAI(depth=SEARCH_DEPTH, time_ms=600000, tt_size_mb=1), game_state), {}
+
+    def search(chess_ai, game_state):
+        chess_ai.search(game_state, game_state.turn)
+        return chess_ai
+
+    chess_ai = benchmark.pedantic(search, setup=setup, rounds=3)
+    assert chess_ai.stats.depth == SEARCH_DEPTH
@@ -0,0 +1,78 @@
+import pytest
+from app.models.batch_evaluation import evaluate_batch
+from app.models.chess_ai import ChessAI
+from app.models.evaluation import evaluate
+from app.models.game_state import GameState
+
+POSITIONS = [
+    'rnkbr/ppppp/5/5/PPPPP/RNKBR w',
+    'rnkbr/pp1pp/5/2p2/PPPPP/RNKBR w',
+    'rnkbr/p1p1p/1p1p1/1P1P1/P1P1P/RNKBR w',
+    'r1kbr/1p2P/nP1p1/R1p2/4P/1NKBR w',
+    'r1k1r/pp1pp/2n2/2Pb1/PP1PP/RNKBR b',
+    '2kr1/1pp2/p4/4P/PP3/1K1R1 b',
+    'rk3/p1p2/1p3/3P1/P3P/1K2R w',
+    '2k2/P4/5/5/4p/2K2 w',
+    'k4/5/1QK2/5/5/5 w',
+]
+
+
+def children(game_state):
+    for start, end in game_state.get_all_possible_moves(game_state.turn):
+        game_state.make_move(start[0], start[1], end[0], end[1])
+        yield (start, end)
+        game_state.unmake_move()
+
+
+@pytest.mark.parametrize('fen', POSITIONS)
+def test_incremental_terms_match_a_fresh_position(fen):
+    # The piece-square score and pawn files kept by make_move and unmake_move
+    # must score every node exactly like a position built from scratch.
+    game_state = GameState.from_fen(fen)
+    before = evaluate(game_state)
+    for _ in children(game_state):
+        if game_state.game_over:
+            continue
+        assert evaluate(game_state) == pytest.approx(evaluate(GameState.from_fen(game_state.to_fen())))
+        for _ in children(game_state):
+            if not game_state.game_over:
+                assert evaluate(game_state) == pytest.approx(evaluate(GameState.from_fen(game_state.to_fen())))
+    assert evaluate(game_state) == pytest.approx(before)
+
+
+def test_incremental_ranks_moves_like_the_full_evaluator():
+    # Scores differ by the legal versus pseudo-legal mobility term, but the
+    # two evaluators should order the moves of each position the same way
+    # and pick a move the full evaluator rates within a pawn of its best.
+    chess_ai = ChessAI()
+    agree = compared = 0
+    for fen in POSITIONS:
+        game_state = GameState.from_fen(fen)
+        sign = 1 if game_state.turn == 'black' else -1
+        scores = [(sign * evaluate(game_state), sign * chess_ai.evaluate_board(game_state))
+                  for _ in children(game_state)]
+        for i, (incremental, full) in enumerate(scores):
+            for other_incremental, other_full in scores[i + 1:]:
+                if incremental == other_incremental or full == other_full:
+                    continue
+                compared += 1
+                agree += (incremental > other_incremental) == (full > other_full)
+        best_full = max(full for _, full in scores)
+        chosen_full = max(scores)[1]
+        assert chosen_full >= best_full - 1, fen
+    assert agree / compared >= 0.95
+
+
+def test_batch_evaluation_matches_evaluate():
+    # The vectorized evaluator scores each position of a batch, finished
+    # games included, exactly like evaluation.evaluate.
+    game_states = []
+    for fen in POSITIONS:
+        game_state = GameState.from_fen(fen)
+        game_states.append(GameState.from_fen(fen))
+        game_states.extend(GameState.from_fen(game_state.to_fen()) for _ in children(game_state))
+    assert any(game_state.game_over for game_state in game_states)
+    expected = [evaluate(game_state) for game_state in game_states]
+    assert evaluate_batch(game_states) == pytest.approx(expected)
+    assert evaluate_batch(game_states[:1]) == pytest.approx(expected[:1])
+    assert evaluate_batch([]) == []
@@ -0,0 +1,149 @@
+import pytest
+from app.models.bitboard import square
+from app.models.chess_ai import ChessAI
+from app.models.game_state import NO_PROGRESS_PLIES, GameState
+from app.services.game_store import SavedGame
+from app.services.game_service import GameService
+
+# Blocked pawns and two kings that shuffle back and forth: every fourth ply
+# repeats a position and nothing resets the halfmove clock.
+SHUFFLE_FEN = 'k4/5/p4/P4/5/4K w'
+SHUFFLE = [((5, 4), (5, 3)), ((0, 0), (0, 1)), ((5, 3), (5, 4)), ((0, 1), (0, 0))]
+
+
+@pytest.mark.parametrize('fen', [
+    'kk3/5/5/5/5/K4 w',
+    'R4/5/5/5/5/K4 b',
+    'P3k/5/5/5/5/K4 w',
+    'k4/5/5/5/5/K3p b',
+    'rnkbr/ppppp/5/5/PPPPP w',
+])
+def test_from_fen_rejects_impossible_positions(fen):
+    with pytest.raises(ValueError):
+        GameState.from_fen(fen)
+
+
+def assert_matches_fresh_position(game_state):
+    fresh = GameState.from_fen(game_state.to_fen())
+    for team in ('white', 'black'):
+        assert sorted(game_state.get_all_possible_moves(team)) == sorted(fresh.get_all_possible_moves(team))
+        assert game_state.has_legal_move(team) == fresh.has_legal_move(team)
+        assert game_state.attack_map(team) == fresh.attack_map(team)
+    assert game_state.check == fresh.check
+
+
+@pytest.mark.parametrize('fen', [
+    'rnkbr/ppppp/5/5/PPPPP/RNKBR w',
+    'r1kbr/1p2P/nP1p1/R1p2/4P/1NKBR w',
+    'rk3/p1p2/1p3/3P1/P3P/1K2R w',
+])
+def test_cached_move_info_survives_make_and_unmake(fen):
+    # The move lists and check status cached per position are carried in the
+    # undo records; after each unmake they must match a position built from
+    # scratch, both when the cache was filled and when move_piece dropped it.
+    game_state = GameState.from_fen(fen)
+    for start, end in game_state.get_all_possible_moves(game_state.turn):
+        game_state.make_move(start[0], start[1], end[0], end[1])
+        assert_matches_fresh_position(game_state)
+        for reply_start, reply_end in game_state.get_all_possible_moves(game_state.turn)[:4]:
+            game_state.make_move(reply_start[0], reply_start[1], reply_end[0], reply_end[1])
+            game_state.unmake_move()
+            assert_matches_fresh_position(game_state)
+        game_state.unmake_move()
+        assert_matches_fresh_position(game_state)
+    start, end = game_state.get_all_possible_moves(game_state.turn)[0]
+    game_state.move_piece(start[0], start[1], end[0], end[1])
+    game_state.unmake_move()
+    assert game_state.position is None or game_state.position.hash == game_state.hash
+    assert_matches_fresh_position(game_state)
+
+
+def play(game_state, moves):
+    for start, end in moves:
+        game_state.move_piece(start[0], start[1], end[0], end[1])
+
+
+def test_third_occurrence_is_a_draw():
+    game_state = GameState.from_fen(SHUFFLE_FEN)
+    play(game_state, SHUFFLE)
+    assert game_state.repetitions() == 2
+    assert not game_state.game_over
+    play(game_state, SHUFFLE[:3])
+    assert not game_state.game_over
+    play(game_state, SHUFFLE[3:])
+    assert game_state.repetitions() == 3
+    assert game_state.game_over and game_state.draw
+    assert 'repetition' in game_state.message
+
+
+def test_no_progress_draw_after_fifty_plies():
+    game_state = GameState.from_fen(SHUFFLE_FEN)
+    # Stand in for 48 earlier plies that never repeated a position.
+    game_state.restore_history(list(range(NO_PROGRESS_PLIES - 2)) + [game_state.hash], NO_PROGRESS_PLIES - 2)
+    play(game_state, SHUFFLE[:1])
+    assert game_state.halfmove_clock == NO_PROGRESS_PLIES - 1
+    assert not game_state.game_over
+    play(game_state, SHUFFLE[1:2])
+    assert game_state.halfmove_clock == NO_PROGRESS_PLIES
+    assert game_state.game_over and game_state.draw
+    assert game_state.is_path_draw()
+
+
+@pytest.mark.parametrize('move', [
+    ((3, 0), (2, 0)),  # pawn push
+    ((3, 0), (2, 1)),  # pawn capture
+    ((5, 4), (4, 3)),  # king capture
+])
+def test_captures_and_pawn_moves_reset_the_clock(move):
+    game_state = GameState.from_fen('k4/5/1p3/P4/3r1/4K w')
+    game_state.restore_history(list(range(40)) + [game_state.hash], 40)
+    play(game_state, [move])
+    assert game_state.halfmove_clock == 0
+    assert game_state.history[-1] == game_state.hash
+    assert game_state.repetitions() == 1
+
+
+def test_unmake_move_restores_history_and_clock():
+    game_state = GameState.from_fen('k4/5/1p3/P4/3r1/4K w')
+    play(game_state, [((5, 4), (5, 3)), ((0, 0), (0, 1))])
+    history, clock = list(game_state.history), game_state.halfmove_clock
+    for start, end in game_state.get_all_possible_moves(game_state.turn):
+        game_state.make_move(start[0], start[1], end[0], end[1])
+        assert len(game_state.history) == len(history) + 1
+        game_state.unmake_move()
+        assert game_state.history == history
+        assert game_state.halfmove_clock == clock
+
+
+def test_restore_rebuilds_the_repetition_history():
+    # A snapshot after the first shuffle, then two more plies in the log: the
+    # four reversible moves before the snapshot give back the positions a
+    # repetition is counted against.
+    original = GameState.from_fen(SHUFFLE_FEN)
+    play(original, SHUFFLE[:2])
+    snapshot = GameState.from_fen(SHUFFLE_FEN)
+    play(snapshot, SHUFFLE)
+    moves = [(ply, square(*start), square(*end)) for ply, (start, end) in enumerate(SHUFFLE + SHUFFLE[:2], 1)]
+    last = [moves[3][1], moves[3][2]]
+    saved = SavedGame({'mode': 'human', 'ai_depth_white': 2, 'ai_depth_black': 2, 'time_ms': 1000},
+                      4, snapshot.to_fen(), snapshot.moved, last, 4, moves)
+    service = GameService()
+    service.restore(saved)
+    play(original, SHUFFLE[2:] + SHUFFLE[:2])
+    assert service.ply == 6
+    assert service.game_state.history == original.history
+    assert service.game_state.halfmove_clock == original.halfmove_clock == 6
+    play(service.game_state, SHUFFLE[2:])
+    assert service.game_state.game_over and service.game_state.draw
+
+
+def test_minimax_scores_a_forced_repetition_as_a_draw():
+    # White is a queen down, but moving its king back repeats a position, so
+    # best play is that draw.
+    game_state = GameState.from_fen('k2q1/5/5/5/5/K4 w')
+    play(game_state, [((5, 0), (4, 0)), ((0, 0), (0, 1)), ((4, 0), (5, 0)), ((0, 1), (0, 0))])
+    chess_ai = ChessAI(depth=2, time_ms=60000)
+    chess_ai.search_depth = 2
+    score, move = chess_ai.minimax(game_state, 2, float('-inf'), float('inf'), 'white')
+    assert (score, move) == (0, ((5, 0), (4, 0)))
+    assert chess_ai.stats.repetitions > 0
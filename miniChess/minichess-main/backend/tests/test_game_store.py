@@ -0,0 +1,129 @@
+import asyncio
+import random
+import threading
+import pytest
+from app.services.game_service import SNAPSHOT_INTERVAL
+from app.services.game_store import FileGameStore, SqliteGameStore, StoreWriter
+from app.services.session_manager import SessionManager, SessionNotFound
+
+START = 'rnkbr/ppppp/5/5/PPPPP/RNKBR w'
+SETTINGS = {'mode': 'human', 'ai_depth_white': 2, 'ai_depth_black': 2, 'time_ms': 1000}
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def store(request, tmp_path):
+    store = FileGameStore(str(tmp_path / 'games')) if request.param == 'file' else \
+        SqliteGameStore(str(tmp_path / 'games.db'))
+    yield store
+    store.close()
+
+
+def play(service, plies, rng):
+    for _ in range(plies):
+        state = service.game_state
+        (start_row, start_col), (end_row, end_col) = rng.choice(sorted(state.get_all_possible_moves(state.turn)))
+        service.select_piece(start_row, start_col)
+        service.make_move(start_row, start_col, end_row, end_col)
+        assert not service.game_state.game_over
+
+
+def assert_same_game(resumed, original):
+    assert resumed.ply == original.ply
+    assert resumed.mode == original.mode
+    for field in ('board', 'turn', 'moved', 'last_move', 'hash', 'halfmove_clock', 'check'):
+        assert getattr(resumed.game_state, field) == getattr(original.game_state, field), field
+    # Only positions since the last capture or pawn move can repeat, and
+    # those are all a resumed game rebuilds.
+    window = resumed.game_state.halfmove_clock + 1
+    assert resumed.game_state.history[-window:] == original.game_state.history[-window:]
+
+
+def test_log_and_snapshot_round_trip(store):
+    store.write([('game', 'g', SETTINGS, START)] + [('move', 'g', ply, ply, ply + 5) for ply in (1, 2, 3)])
+    saved = store.load('g')
+    assert (saved.settings, saved.ply, saved.fen, saved.moved, saved.last, saved.clock) == \
+        (SETTINGS, 0, START, 0, None, 0)
+    assert [tuple(move) for move in saved.moves] == [(1, 1, 6), (2, 2, 7), (3, 3, 8)]
+
+    # A snapshot keeps the last `clock` moves before it and every move after.
+    store.write([('snapshot', 'g', 2, 'fen-at-2', 9, [2, 7], 1), ('move', 'g', 4, 4, 9)])
+    saved = store.load('g')
+    assert (saved.ply, saved.fen, saved.moved, saved.last, saved.clock) == (2, 'fen-at-2', 9, (2, 7), 1)
+    assert [tuple(move) for move in saved.moves] == [(2, 2, 7), (3, 3, 8), (4, 4, 9)]
+
+    # Starting the game again drops its old log.
+    store.write([('game', 'g', SETTINGS, START)])
+    assert store.load('g').moves == []
+    assert store.load('unknown') is None
+
+
+def test_torn_log_record_is_ignored(tmp_path):
+    store = FileGameStore(str(tmp_path))
+    store.write([('game', 'g', SETTINGS, START), ('move', 'g', 1, 21, 16)])
+    with open(store._path('g', '.log'), 'ab') as f:
+        f.write(b'\x02\x00')
+    assert store.load('g').moves == [(1, 21, 16)]
+
+
+def test_writer_tracks_pending_events_until_written(store):
+    release = threading.Event()
+    write = store.write
+
+    def slow_write(events):
+        release.wait(5)
+        write(events)
+
+    store.write = slow_write
+    writer = StoreWriter(store)
+    writer.submit('game', 'g', SETTINGS, START)
+    writer.submit('move', 'g', 1, 21, 16)
+    writer.submit('game', 'h', SETTINGS, START)
+    assert sum(writer.pending.values()) == 3
+    assert store.load('g') is None
+    release.set()
+    writer.wait_for('g')
+    assert 'g' not in writer.pending
+    assert store.load('g').moves == [(1, 21, 16)]
+    writer.flush()
+    assert writer.pending == {}
+    assert store.load('h') is not None
+    writer.close()
+
+
+def test_evicted_game_resumes_from_snapshot_and_log(store):
+    # Plies past a snapshot are replayed from the log on top of it, the
+    # reversible moves before it rebuild the repetition history, and the
+    # resumed game keeps journaling where it left off.
+    manager = SessionManager(max_sessions=1, store=store)
+    manager.start()
+    rng = random.Random(143)
+    original = manager.create('g')
+    original.init_game('human', 2, 2, 1000)
+    play(original, SNAPSHOT_INTERVAL + 5, rng)
+    assert original.game_state.halfmove_clock > 5
+    manager.create('other').init_game('human', 2, 2, 1000)
+    manager.enforce_limits()
+    assert list(manager.sessions) == ['other']
+
+    resumed = asyncio.run(manager.get_async('g'))
+    assert resumed is not original
+    assert_same_game(resumed, original)
+    saved = store.load('g')
+    assert saved.ply == SNAPSHOT_INTERVAL
+    assert saved.moves[-1][0] == SNAPSHOT_INTERVAL + 5
+
+    play(resumed, SNAPSHOT_INTERVAL, rng)
+    manager.create('other')
+    manager.enforce_limits()
+    again = asyncio.run(manager.get_async('g'))
+    assert_same_game(again, resumed)
+    manager.shutdown()
+
+
+def test_unknown_game_is_not_resumed(store):
+    manager = SessionManager(store=store)
+    with pytest.raises(SessionNotFound):
+        asyncio.run(manager.get_async('nothing'))
+    assert 'nothing' in manager.missing
+    manager.create('nothing')
+    assert 'nothing' not in manager.missing
@@ -0,0 +1,14 @@
+import pytest
+from app.bench import POSITIONS, perft
+from app.models.game_state import GameState
+
+
+@pytest.mark.parametrize('name', sorted(POSITIONS))
+def test_perft_counts(name):
+    fen, expected = POSITIONS[name]
+    game_state = GameState.from_fen(fen)
+    for depth, count in enumerate(expected, 1):
+        assert perft(game_state, depth) == count, f"perft({depth})"
+    # make_move and unmake_move must leave the position as it was.
+    assert game_state.to_fen() == fen
+    assert game_state.hash == GameState.from_fen(fen).hash
@@ -0,0 +1,59 @@
+import multiprocessing
+import pytest
+from app.models import time_manager
+from app.models.chess_ai import ChessAI, analyse_position, evaluate_positions, search_root_moves
+from app.models.game_state import GameState
+from app.models.transposition import TranspositionTable
+
+START = 'rnkbr/ppppp/5/5/PPPPP/RNKBR w'
+
+
+@pytest.fixture
+def stop_flags():
+    flags = multiprocessing.RawArray('b', 4)
+    time_manager.install_stop_flags(flags)
+    yield flags
+    time_manager.install_stop_flags(None)
+
+
+def test_stopped_slot_does_not_leak_into_the_next_search(stop_flags):
+    # A worker engine is cached and reused: after a cancelled root search,
+    # an analysis job in the same worker must not check the old slot.
+    game_state = GameState.from_fen(START)
+    moves = game_state.get_all_possible_moves('white')
+    stop_flags[1] = 1
+    completed = search_root_moves(game_state.board, 'white', 'white', moves, 4, 60000, 'incremental',
+                                  stop_slot=1)[4]
+    assert not completed
+    result = analyse_position(START, 3, 60000, 'incremental')
+    assert result['depth'] == 3
+
+
+def test_analysis_workers_report_invalid_positions():
+    # Batch analysis leaves parsing to the workers, which answer an invalid
+    # position with an error and still score the rest of its chunk.
+    assert 'Invalid position' in analyse_position('rnkbr/ppppp w', 2, 1000, 'incremental')['error']
+    results = evaluate_positions(['kk3/5/5/5/5/K4 w', START, 'x'])
+    assert 'one king' in results[0]['error']
+    assert results[1]['depth'] == 0 and 'error' not in results[1]
+    assert 'Invalid position' in results[2]['error']
+
+
+def test_path_draw_scores_stay_out_of_the_transposition_table():
+    # After the kings shuffle back, white can repeat by moving its king again
+    # and takes the draw. Another game reaching the same position without that
+    # history shares the table and must still see that white is lost.
+    fen = 'k2q1/5/5/5/5/K4 w'
+    game_state = GameState.from_fen(fen)
+    for start, end in [((5, 0), (4, 0)), ((0, 0), (0, 1)), ((4, 0), (5, 0)), ((0, 1), (0, 0))]:
+        game_state.move_piece(start[0], start[1], end[0], end[1])
+    table = TranspositionTable(1)
+    engine = ChessAI(depth=3, time_ms=60000, transposition_table=table)
+    assert engine.search(game_state, 'white') == ((5, 0), (4, 0))
+    assert engine.score == 0
+
+    shared = ChessAI(depth=3, time_ms=60000, transposition_table=table)
+    fresh = ChessAI(depth=3, time_ms=60000)
+    shared.search(GameState.from_fen(fen), 'white')
+    fresh.search(GameState.from_fen(fen), 'white')
+    assert shared.score == fresh.score < 0
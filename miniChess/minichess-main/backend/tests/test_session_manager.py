@@ -0,0 +1,38 @@
+import pytest
+from app.services.session_manager import SessionManager, SessionNotFound
+
+
+def test_least_recently_used_session_is_evicted_first():
+    manager = SessionManager(max_sessions=2)
+    for game_id in ('a', 'b'):
+        manager.create(game_id).init_game('human', 2, 2, 1000)
+    manager.get('a')
+    manager.create('c').init_game('human', 2, 2, 1000)
+    manager.enforce_limits()
+    assert list(manager.sessions) == ['a', 'c']
+    with pytest.raises(SessionNotFound):
+        manager.get('b')
+
+
+def test_memory_cap_evicts_ai_sessions():
+    manager = SessionManager(tt_size_mb=1, max_memory_mb=5)
+    for index in range(10):
+        manager.create(str(index)).init_game('ai_vs_ai', 2, 2, 1000)
+        manager.enforce_limits()
+        assert manager.memory_usage_mb() <= 5
+    # Two 1 MB tables per game: only the two newest games fit.
+    assert list(manager.sessions) == ['8', '9']
+
+
+def test_default_sizing_holds_thousands_of_ai_games():
+    manager = SessionManager()
+    service = manager.create('ai')
+    service.init_game('ai', 2, 2, 1000)
+    assert manager.max_memory_mb / manager.memory_usage_mb() >= 2000
+
+
+def test_idle_sessions_expire():
+    manager = SessionManager(idle_timeout=0)
+    manager.create('old').init_game('human', 2, 2, 1000)
+    with pytest.raises(SessionNotFound):
+        manager.get('old')
@@ -0,0 +1,19 @@
+from app.tournament import parse_engine, sprt_bounds, sprt_llr
+
+
+def test_sprt_stops_on_a_one_sided_run():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert sprt_llr(30, 5, 0, 0, 10) >= upper
+    assert sprt_llr(0, 5, 30, 0, 10) <= lower
+
+
+def test_sprt_stays_open_on_an_even_run():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower < sprt_llr(10, 10, 10, 0, 10) < upper
+    assert lower < sprt_llr(0, 0, 0, 0, 10) < upper
+
+
+def test_parse_engine():
+    config = parse_engine('new:depth=4,eval=full', 'candidate')
+    assert (config['name'], config['depth'], config['eval']) == ('new', 4, 'full')
+    assert parse_engine('time_ms=200', 'baseline')['name'] == 'baseline'
@@ -14,6 +14,7 @@ export interface Move {
 }
 
 export interface GameState {
+  game_id: string | null;
   board: (Piece | null)[][];
   turn: 'white' | 'black';
   selected_piece: [number, number] | null;
@@ -1,4 +1,5 @@
 export interface GameState {
+  game_id: string | null;
   board: Array<Array<{ team: string; type: string; value: number; has_moved: boolean } | null>>;
   turn: string;
   selected_piece: [number, number] | null;
@@ -22,10 +23,17 @@ interface GameInit {
   mode: 'ai' | 'human' | 'ai_vs_ai';
   ai_depth_white?: number;
   ai_depth_black?: number;
+  time_ms?: number;
 }
 
 const API_URL = 'http://localhost:8000';
 
+let gameId: string | null = null;
+
+function gameUrl(path: string): string {
+  return gameId ? `${API_URL}${path}?game_id=${encodeURIComponent(gameId)}` : `${API_URL}${path}`;
+}
+
 export async function initGame(init: GameInit): Promise<GameState> {
   const response = await fetch(`${API_URL}/game/init`, {
     method: 'POST',
@@ -34,20 +42,23 @@ export async function initGame(init: GameInit): Promise<GameState> {
       mode: init.mode,
       ai_depth_white: init.ai_depth_white ?? 2,
       ai_depth_black: init.ai_depth_black ?? 2,
+      time_ms: init.time_ms ?? 5000,
     }),
   });
   if (!response.ok) throw new Error(`Failed to initialize game: ${response.statusText}`);
-  return response.json();
+  const state: GameState = await response.json();
+  gameId = state.game_id;
+  return state;
 }
 
 export async function getGameState(): Promise<GameState> {
-  const response = await fetch(`${API_URL}/game/state`);
+  const response = await fetch(gameUrl('/game/state'));
   if (!response.ok) throw new Error(`Failed to fetch game state: ${response.statusText}`);
   return response.json();
 }
 
 export async function selectPiece(row: number, col: number): Promise<GameState> {
-  const response = await fetch(`${API_URL}/game/select`, {
+  const response = await fetch(gameUrl('/game/select'), {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ row, col }),
@@ -57,7 +68,7 @@ export async function selectPiece(row: number, col: number): Promise<GameState>
 }
 
 export async function makeMove(move: Move): Promise<GameState> {
-  const response = await fetch(`${API_URL}/game/move`, {
+  const response = await fetch(gameUrl('/game/move'), {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify(move),
@@ -67,7 +78,7 @@ export async function makeMove(move: Move): Promise<GameState> {
 }
 
 export async function makeAIMove(): Promise<GameState> {
-  const response = await fetch(`${API_URL}/game/ai_move`, {
+  const response = await fetch(gameUrl('/game/ai_move'), {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({}),